@@ -1,5 +1,6 @@
-from flask import Flask, redirect, request, jsonify, send_file, session
+from flask import Flask, redirect, request, jsonify, send_file, session, Response, stream_with_context
 import requests
+import time
 from flask_cors import CORS
 
 # Import configuration
@@ -7,15 +8,24 @@ from config.settings import REDIRECT_URI, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
 
 # Import utilities
 from utils.auth_utils import get_credentials, extract_access_token
+from utils.date_utils import resolve_date_window, ALL_TIME
 
 # Import services
 from services.email_service import get_email_stats
-from services.form_service import get_form_stats, get_active_inactive_forms, get_form_abandonment_analysis, get_active_inactive_forms_from_cache, get_form_abandonment_analysis_from_cache
+from services.form_service import get_form_stats, get_active_inactive_forms, get_form_abandonment_analysis, get_active_inactive_forms_from_cache, get_form_abandonment_analysis_from_cache, get_form_funnel_analysis
 from services.Landing_page_service import get_landing_page_stats, get_filtered_landing_page_stats
-from services.prospect_service import get_prospect_health, fetch_all_prospects, find_duplicate_prospects, find_inactive_prospects, find_missing_critical_fields, find_scoring_inconsistencies, get_filtered_prospects
-from services.engagement_service import get_engagement_programs_analysis, get_engagement_programs_performance
+from services.prospect_service import get_prospect_health, build_prospect_health, summarize_health, get_health_detail_page, paginate, find_duplicate_prospects, DEFAULT_PAGE_SIZE
+from services.dedupe_service import expand_duplicate_clusters
+from services.prospect_filter_service import get_tag_index
+from services.prospect_snapshot import FIELD_COLUMNS, NO_DATE, BAD_DATE
+from services.prospect_store import get_prospect_store
+from services.prospect_health_engine import HEALTH_THRESHOLDS
+from services.export_service import EXPORT_FORMATS, EXPORT_COLUMNS, iter_health_rows, iter_prospect_rows, iter_export
+from services.engagement_service import (
+    get_program_dataset, get_engagement_programs_analysis_from_cache, get_engagement_programs_performance_from_cache
+)
 from services.pdf_service import create_professional_pdf_report, create_form_pdf_report, create_prospect_pdf_report, create_comprehensive_summary_pdf
-from services.utm_service import get_utm_analysis, get_campaign_engagement_analysis
+from services.utm_service import get_utm_analysis, get_utm_issues_page, get_utm_export_rows, get_campaign_engagement_analysis
 
 
 # Import Google integration
@@ -49,6 +59,22 @@ data_cache = {
 prospect_cache = {}
 CACHE_EXPIRY = 1800  # 30 minutes in seconds
 
+def get_window_cache(section, cache_key):
+    """Cached result for a date window, or None once it is older than CACHE_EXPIRY"""
+    entry = data_cache[section].get(cache_key)
+    if entry is None or time.time() - entry[0] >= CACHE_EXPIRY:
+        return None
+    return entry[1]
+
+def set_window_cache(section, cache_key, value):
+    """Cache a date window's result, dropping the section's expired window entries"""
+    cache = data_cache[section]
+    now = time.time()
+    for key, entry in list(cache.items()):
+        if isinstance(key, tuple) and now - entry[0] >= CACHE_EXPIRY:
+            cache.pop(key, None)
+    cache[cache_key] = (now, value)
+
 # ===== Authentication Routes =====
 @app.route("/setup", methods=["POST", "OPTIONS"])
 def setup():
@@ -189,10 +215,8 @@ def get_form_stats_route():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        # Convert filter type to date range if provided
-        if filter_type and not start_date and not end_date:
-            from services.form_service import get_date_range_from_filter
-            start_date, end_date = get_date_range_from_filter(filter_type)
+        # Resolve to a canonical window (v4 created_after/created_before strings)
+        start_date, end_date = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
         form_stats = get_form_stats(access_token, start_date, end_date)
         # Cache form stats for other form routes
@@ -230,10 +254,8 @@ def get_form_abandonment_analysis_route():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        # Convert filter type to date range if provided
-        if filter_type and not start_date and not end_date:
-            from services.form_service import get_date_range_from_filter
-            start_date, end_date = get_date_range_from_filter(filter_type)
+        # Resolve to a canonical window (v4 created_after/created_before strings)
+        start_date, end_date = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
         # Check cache first
         cached_forms = data_cache['forms'].get(access_token)
@@ -257,17 +279,50 @@ def get_filtered_form_stats_route():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        # Convert filter type to date range if provided
-        if filter_type and not start_date and not end_date:
-            from services.form_service import get_date_range_from_filter
-            start_date, end_date = get_date_range_from_filter(filter_type)
+        # Resolve to a canonical window (v4 created_after/created_before strings)
+        start_date, end_date = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
-        # Fetch fresh data with date filters
-        filtered_stats = get_form_stats(access_token, start_date, end_date)
+        # Equivalent windows share a cache entry
+        cache_key = (access_token, start_date, end_date)
+        filtered_stats = get_window_cache('forms', cache_key)
+        if filtered_stats is None:
+            filtered_stats = get_form_stats(access_token, start_date, end_date)
+            set_window_cache('forms', cache_key, filtered_stats)
         return jsonify(filtered_stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/get-form-funnel", methods=["GET"])
+def get_form_funnel_route():
+    access_token = extract_access_token(request.headers.get("Authorization"))
+    if not access_token:
+        return jsonify({"error": "Access token is required"}), 401
+    
+    try:
+        # Get date filters from query parameters
+        filter_type = request.args.get("filter_type")
+        start_date = request.args.get("start_date")
+        end_date = request.args.get("end_date")
+        
+        # Resolve to a canonical window (v4 created_after/created_before strings)
+        start_date, end_date = resolve_date_window(filter_type, start_date, end_date).as_v4()
+        
+        # New prospects come from the synced prospect snapshot
+        cached_health = data_cache['prospects'].get(access_token)
+        if not cached_health:
+            return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        # Equivalent windows share a cache entry
+        cache_key = ("funnel", access_token, start_date, end_date)
+        funnel_data = get_window_cache('forms', cache_key)
+        if funnel_data is None:
+            funnel_data = get_form_funnel_analysis(access_token, cached_health['snapshot'], cached_health['lock'],
+                                                   start_date, end_date)
+            set_window_cache('forms', cache_key, funnel_data)
+        return jsonify(funnel_data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ===== Landing Page Routes =====
 @app.route("/get-landing-page-stats", methods=["GET"])
 def get_landing_page_stats_route():
@@ -281,10 +336,8 @@ def get_landing_page_stats_route():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        # Convert filter type to date range if provided
-        if filter_type and not start_date and not end_date:
-            from services.Landing_page_service import get_date_range_from_filter
-            start_date, end_date = get_date_range_from_filter(filter_type)
+        # Resolve to a canonical window (v4 created_after/created_before strings)
+        start_date, end_date = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
         landing_page_stats = get_landing_page_stats(access_token, start_date, end_date)
         # Cache landing page stats
@@ -305,7 +358,12 @@ def get_filtered_landing_page_stats_route():
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
         
-        filtered_stats = get_filtered_landing_page_stats(access_token, filter_type, start_date, end_date)
+        # Equivalent windows share a cache entry
+        cache_key = (access_token, resolve_date_window(filter_type, start_date, end_date).key)
+        filtered_stats = get_window_cache('landing_pages', cache_key)
+        if filtered_stats is None:
+            filtered_stats = get_filtered_landing_page_stats(access_token, filter_type, start_date, end_date)
+            set_window_cache('landing_pages', cache_key, filtered_stats)
         return jsonify(filtered_stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -359,76 +417,96 @@ def get_prospect_health_route():
         return jsonify({"error": "Access token required"}), 401
     
     try:
-        health_data = get_prospect_health(access_token)
-        # Cache the data in memory using access token as key
-        data_cache['prospects'][access_token] = health_data
-        return jsonify(health_data)
+        full_sync = request.args.get("refresh") == "full"
+        store = get_prospect_store(get_credentials()['business_unit_id'])
+        with store.lock:
+            snapshot, health = build_prospect_health(access_token, full_sync)
+            # Keep the snapshot server-side; detail lists are paged from it. Syncs change it
+            # in place, so every reader holds the store lock
+            data_cache['prospects'][access_token] = {"snapshot": snapshot, "health": health, "lock": store.lock}
+            summary = summarize_health(health, get_health_thresholds())
+        return jsonify(summary)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/get-inactive-prospects", methods=["GET"])
-def get_inactive_prospects():
+def get_health_thresholds():
+    """Inactivity and scoring thresholds from the query string; omitted ones keep their defaults"""
+    thresholds = {}
+    for name in HEALTH_THRESHOLDS:
+        value = request.args.get(name, type=int)
+        if value is not None:
+            thresholds[name] = value
+    return thresholds
+
+def get_health_details_response(detail_type, total_key, items_key):
+    """Serve one page of a cached prospect health detail list"""
     access_token = extract_access_token(request.headers.get("Authorization"))
     try:
-        # Use cached data from memory if available
         cached_health = data_cache['prospects'].get(access_token)
-        if cached_health and 'all_prospects' in cached_health:
-            prospects = cached_health['all_prospects']
-            inactive_prospects = find_inactive_prospects(prospects)
-            
-            return jsonify({
-                "total_inactive": len(inactive_prospects),
-                "inactive_prospects": inactive_prospects
-            })
-        else:
+        if not cached_health:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
+        
+        page = request.args.get("page", 1, type=int)
+        page_size = request.args.get("page_size", DEFAULT_PAGE_SIZE, type=int)
+        with cached_health['lock']:
+            items, meta = get_health_detail_page(cached_health['snapshot'], cached_health['health'], detail_type,
+                                                 page, page_size, get_health_thresholds())
+        
+        return jsonify({
+            total_key: meta["total"],
+            items_key: items,
+            "pagination": meta
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/get-inactive-prospects", methods=["GET"])
+def get_inactive_prospects():
+    return get_health_details_response("inactive", "total_inactive", "inactive_prospects")
+
 @app.route("/get-duplicate-prospects", methods=["GET"])
 def get_duplicate_prospects():
-    access_token = extract_access_token(request.headers.get("Authorization"))
-    try:
-        # Use cached data from memory if available
+    if request.args.get("fuzzy", "false").lower() == "true":
+        access_token = extract_access_token(request.headers.get("Authorization"))
         cached_health = data_cache['prospects'].get(access_token)
-        if cached_health and 'all_prospects' in cached_health:
-            prospects = cached_health['all_prospects']
-            duplicates = find_duplicate_prospects(prospects)
-            
-            return jsonify({
-                "total_duplicate_groups": len(duplicates),
-                "duplicate_prospects": duplicates
-            })
-        else:
+        if not cached_health:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        
+        # Clustering reads a few fields per row straight from the columns; dicts are built for the page only
+        snapshot = cached_health['snapshot']
+        with cached_health['lock']:
+            duplicates, meta = paginate(find_duplicate_prospects(snapshot.rows(), fuzzy=True),
+                                        request.args.get("page", 1, type=int),
+                                        request.args.get("page_size", DEFAULT_PAGE_SIZE, type=int))
+            page_ids = [prospect_id for cluster in duplicates for prospect_id in cluster["prospect_ids"]]
+            duplicate_prospects = expand_duplicate_clusters(duplicates, snapshot.records(page_ids))
+        return jsonify({
+            "total_duplicate_groups": meta["total"],
+            "duplicate_prospects": duplicate_prospects,
+            "pagination": meta
+        })
+    return get_health_details_response("duplicates", "total_duplicate_groups", "duplicate_prospects")
 
 @app.route("/get-missing-fields-prospects", methods=["GET"])
 def get_missing_fields_prospects():
-    access_token = extract_access_token(request.headers.get("Authorization"))
-    try:
-        # Use cached data from memory if available
-        cached_health = data_cache['prospects'].get(access_token)
-        if cached_health and 'all_prospects' in cached_health:
-            prospects = cached_health['all_prospects']
-            missing_fields = find_missing_critical_fields(prospects)
-            
-            return jsonify({
-                "total_with_missing_fields": len(missing_fields),
-                "prospects_missing_fields": missing_fields
-            })
-        else:
-            return jsonify({"error": "Please run prospect health analysis first"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return get_health_details_response("missing_fields", "total_with_missing_fields", "prospects_missing_fields")
+
+@app.route("/get-scoring-issues-prospects", methods=["GET"])
+def get_scoring_issues_prospects():
+    return get_health_details_response("scoring_issues", "total_scoring_issues", "prospects_scoring_issues")
 
 @app.route("/filter-prospects", methods=["POST"])
 def filter_prospects_route():
     try:
-        filters = request.json or {}
+        filters = dict(request.json or {})
         print(f"[DEBUG] Received filters: {filters}")
         
+        # Paging and sort options travel with the filters
+        page = filters.pop('page', 1)
+        page_size = filters.pop('page_size', DEFAULT_PAGE_SIZE)
+        sort_field = filters.pop('sort', 'lastActivityAt')
+        descending = filters.pop('direction', 'desc') != 'asc'
+        
         # Get the first (and likely only) cached prospect data
         if not data_cache['prospects']:
             return jsonify({"error": "Please run prospect health analysis first"}), 400
@@ -437,21 +515,32 @@ def filter_prospects_route():
         cached_key = list(data_cache['prospects'].keys())[0]
         cached_health = data_cache['prospects'][cached_key]
         
-        if 'all_prospects' not in cached_health:
+        if 'snapshot' not in cached_health:
             print(f"[DEBUG] Cached data keys: {list(cached_health.keys())}")
-            return jsonify({"error": "Cached data missing all_prospects"}), 400
+            return jsonify({"error": "Cached data missing prospect snapshot"}), 400
         
-        prospects = cached_health['all_prospects']
-        print(f"[DEBUG] Found {len(prospects)} cached prospects")
+        snapshot = cached_health['snapshot']
+        print(f"[DEBUG] Found {len(snapshot)} cached prospects")
         
-        # Apply simple client-side filtering
-        filtered_prospects = apply_simple_filters(prospects, filters)
+        # Filter and sort on the snapshot columns; dicts are only built for the requested page
+        with cached_health['lock']:
+            tag_index = get_tag_index(snapshot)
+            positions = sort_positions(snapshot, apply_simple_filters(snapshot, filters, tag_index), sort_field, descending)
+            positions, meta = paginate(positions, page, page_size)
+            total_prospects = len(snapshot)
+            prospects = [snapshot.to_dict(position) for position in positions]
+        
+        # Tags are skipped until they have been synced, so don't report the tag filter as applied
+        filters_applied = dict(filters)
+        if tag_index is None:
+            filters_applied.pop('tags', None)
         
         return jsonify({
-            "total_prospects": len(prospects),
-            "filtered_count": len(filtered_prospects),
-            "prospects": filtered_prospects,
-            "filters_applied": filters
+            "total_prospects": total_prospects,
+            "filtered_count": meta["total"],
+            "prospects": prospects,
+            "pagination": meta,
+            "filters_applied": filters_applied
         })
     except Exception as e:
         print(f"[DEBUG] Filter error: {str(e)}")
@@ -459,128 +548,111 @@ def filter_prospects_route():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-def apply_simple_filters(prospects, filters):
-    """Apply basic filters to prospect data"""
-    filtered = prospects.copy()
+# View name -> predicate on a prospect record
+PROSPECT_VIEWS = {
+    'Active Prospects': lambda p: p.get('lastActivityAt'),
+    'Never Active Prospects': lambda p: not p.get('lastActivityAt'),
+    'Active Prospects For Review': lambda p: p.get('lastActivityAt') and not p.get('isReviewed'),
+    'Assigned Prospects': lambda p: p.get('assignedTo'),
+    'Mailable Prospects': lambda p: not p.get('isDoNotEmail', False) and p.get('email'),
+    'My Prospects': lambda p: p.get('assignedTo') == 'current_user',
+    'My Starred Prospects': lambda p: p.get('isStarred'),
+    'Prospects Not In Salesforce': lambda p: not p.get('salesforceId'),
+    'Reviewed Prospects': lambda p: p.get('isReviewed'),
+    'Unassigned Prospects': lambda p: not p.get('assignedTo'),
+    'Unmailable Prospects': lambda p: p.get('isDoNotEmail', False),
+    'Unsubscribed Prospects': lambda p: p.get('optedOut', False),
+    'Paused Prospects': lambda p: p.get('isPaused', False),
+    'Undelivered Prospects': lambda p: p.get('isEmailHardBounced', False),
+}
+
+def build_prospect_predicate(snapshot, filters, tag_index=None):
+    """Combine tag, view and time filters into a single test on a snapshot row position"""
+    checks = []
+    
+    # Tag filter (resolved against the snapshot's trigram index)
+    tag_filter = filters.get('tags', '')
+    if tag_filter and tag_index is not None:
+        matching_ids = tag_index.search(tag_filter)
+        ids = snapshot.ids
+        checks.append(lambda position: ids[position] in matching_ids)
     
-    # View filters
+    # View filters, read through a row view so only the fields they use are rendered
     view = filters.get('view', 'All Prospects')
-    if view == 'Active Prospects':
-        filtered = [p for p in filtered if p.get('lastActivityAt')]
-    elif view == 'Never Active Prospects':
-        filtered = [p for p in filtered if not p.get('lastActivityAt')]
-    elif view == 'Active Prospects For Review':
-        filtered = [p for p in filtered if p.get('lastActivityAt') and not p.get('isReviewed')]
-    elif view == 'Assigned Prospects':
-        filtered = [p for p in filtered if p.get('assignedTo')]
-    elif view == 'Mailable Prospects':
-        filtered = [p for p in filtered if not p.get('isDoNotEmail', False) and p.get('email')]
-    elif view == 'My Prospects':
-        filtered = [p for p in filtered if p.get('assignedTo') == 'current_user']
-    elif view == 'My Starred Prospects':
-        filtered = [p for p in filtered if p.get('isStarred')]
-    elif view == 'Prospects Not In Salesforce':
-        filtered = [p for p in filtered if not p.get('salesforceId')]
-    elif view == 'Reviewed Prospects':
-        filtered = [p for p in filtered if p.get('isReviewed')]
-    elif view == 'Unassigned Prospects':
-        filtered = [p for p in filtered if not p.get('assignedTo')]
-    elif view == 'Unmailable Prospects':
-        filtered = [p for p in filtered if p.get('isDoNotEmail', False)]
-    elif view == 'Unsubscribed Prospects':
-        filtered = [p for p in filtered if p.get('optedOut', False)]
-    elif view == 'Paused Prospects':
-        filtered = [p for p in filtered if p.get('isPaused', False)]
-    elif view == 'Undelivered Prospects':
-        filtered = [p for p in filtered if p.get('isEmailHardBounced', False)]
+    if view in PROSPECT_VIEWS:
+        view_check = PROSPECT_VIEWS[view]
+        checks.append(lambda position: view_check(snapshot.row(position)))
     
     # Time filters
     time_filter = filters.get('time', 'All Time')
-    if time_filter != 'All Time':
-        from datetime import datetime, timedelta
-        now = datetime.now()
-        activity_field = 'lastActivityAt' if filters.get('activity') == 'Last Activity' else 'createdAt'
-        
-        start_date = None
-        end_date = None
-        
-        if time_filter == 'Today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif time_filter == 'Yesterday':
-            yesterday = now - timedelta(days=1)
-            start_date = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
-        elif time_filter == 'This Quarter':
-            quarter_start_month = ((now.month - 1) // 3) * 3 + 1
-            start_date = now.replace(month=quarter_start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif time_filter == 'This Month':
-            start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif time_filter == 'This Year':
-            start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif time_filter == 'Last 7 Days':
-            start_date = now - timedelta(days=7)
-            end_date = now
-        elif time_filter == 'Last Week':
-            days_since_monday = now.weekday()
-            last_monday = now - timedelta(days=days_since_monday + 7)
-            start_date = last_monday.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = last_monday + timedelta(days=6, hours=23, minutes=59, seconds=59)
-        elif time_filter == 'Last Month':
-            if now.month == 1:
-                start_date = now.replace(year=now.year-1, month=12, day=1, hour=0, minute=0, second=0, microsecond=0)
-                end_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-            else:
-                start_date = now.replace(month=now.month-1, day=1, hour=0, minute=0, second=0, microsecond=0)
-                end_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        elif time_filter == 'Last Quarter':
-            current_quarter = (now.month - 1) // 3 + 1
-            if current_quarter == 1:
-                start_date = now.replace(year=now.year-1, month=10, day=1, hour=0, minute=0, second=0, microsecond=0)
-                end_date = now.replace(year=now.year-1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-            else:
-                last_quarter_start_month = (current_quarter - 2) * 3 + 1
-                last_quarter_end_month = (current_quarter - 1) * 3
-                start_date = now.replace(month=last_quarter_start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-                if last_quarter_end_month in [1, 3, 5, 7, 8, 10, 12]:
-                    last_day = 31
-                elif last_quarter_end_month in [4, 6, 9, 11]:
-                    last_day = 30
-                else:
-                    last_day = 29 if now.year % 4 == 0 and (now.year % 100 != 0 or now.year % 400 == 0) else 28
-                end_date = now.replace(month=last_quarter_end_month, day=last_day, hour=23, minute=59, second=59, microsecond=999999)
-        elif time_filter == 'Last Year':
-            start_date = now.replace(year=now.year-1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_date = now.replace(year=now.year-1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-        
-        if start_date:
-            time_filtered = []
-            for p in filtered:
-                date_val = p.get(activity_field)
-                if date_val:
-                    try:
-                        if 'T' in str(date_val):
-                            prospect_date = datetime.fromisoformat(str(date_val).replace('Z', '+00:00'))
-                        else:
-                            prospect_date = datetime.strptime(str(date_val)[:10], '%Y-%m-%d')
-                        
-                        prospect_date = prospect_date.replace(tzinfo=None)
-                        if end_date:
-                            if start_date <= prospect_date <= end_date:
-                                time_filtered.append(p)
-                        else:
-                            if prospect_date >= start_date:
-                                time_filtered.append(p)
-                    except:
-                        continue
-            filtered = time_filtered
+    if time_filter == 'Custom':
+        window = resolve_date_window(time_filter, filters.get('customStartDate'), filters.get('customEndDate'))
+    else:
+        window = resolve_date_window(time_filter)
+    
+    if window != ALL_TIME:
+        # Compare the epoch column directly; missing and unparseable dates never fall in a window
+        epochs = snapshot.last_activity if filters.get('activity') == 'Last Activity' else snapshot.created_at
+        
+        def in_window(position):
+            epoch = epochs[position]
+            return epoch != NO_DATE and epoch != BAD_DATE and window.contains(epoch)
+        checks.append(in_window)
+    
+    return lambda position: all(check(position) for check in checks)
+
+def apply_simple_filters(snapshot, filters, tag_index=None):
+    """Positions of the snapshot rows matching basic filters"""
+    matches = build_prospect_predicate(snapshot, filters, tag_index)
+    filtered = [position for position in range(len(snapshot)) if matches(position)]
     
     print(f"[DEBUG] Filtered to {len(filtered)} prospects")
     return filtered
 
+def sort_positions(snapshot, positions, field, descending=False):
+    """Order snapshot row positions by one record field, read from its column"""
+    name = FIELD_COLUMNS.get(field)
+    if name is None:
+        return positions
+    # Dates and scores sort on their numbers (missing dates first); grades on their labels
+    if name == 'grade_codes':
+        column, labels = snapshot.grade_codes, snapshot.grade_labels
+        key = lambda position: labels[column[position]]
+    else:
+        key = getattr(snapshot, name).__getitem__
+    return sorted(positions, key=key, reverse=descending)
+
+@app.route("/export-prospects/<list_type>", methods=["GET", "POST"])
+def export_prospects(list_type):
+    """Stream filtered prospects or a health detail list as CSV or NDJSON"""
+    access_token = extract_access_token(request.headers.get("Authorization"))
+    export_format = request.args.get("format", "csv").lower()
+    
+    if list_type not in EXPORT_COLUMNS:
+        return jsonify({"error": f"Unknown export list: {list_type}"}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+    
+    cached_health = data_cache['prospects'].get(access_token)
+    if not cached_health:
+        return jsonify({"error": "Please run prospect health analysis first"}), 400
+    
+    snapshot = cached_health['snapshot']
+    if list_type == "filtered":
+        filters = (request.json or {}) if request.method == "POST" else request.args.to_dict()
+        # Positions shift when a sync runs, so resolve ids now and stream by id
+        with cached_health['lock']:
+            prospect_ids = [snapshot.ids[position] for position in apply_simple_filters(snapshot, filters, get_tag_index(snapshot))]
+        rows = iter_prospect_rows(snapshot, prospect_ids, cached_health['lock'])
+    else:
+        rows = iter_health_rows(snapshot, cached_health['health'], list_type, cached_health['lock'], get_health_thresholds())
+    
+    return Response(
+        stream_with_context(iter_export(rows, list_type, export_format)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename=prospects_{list_type}.{export_format}"}
+    )
+
 # ===== Engagement Programs Routes =====
 @app.route("/get-engagement-programs-analysis", methods=["GET"])
 def get_engagement_programs_analysis_route():
@@ -589,10 +661,10 @@ def get_engagement_programs_analysis_route():
         return jsonify({"error": "Access token required"}), 401
     
     try:
-        analysis_data = get_engagement_programs_analysis(access_token)
-        # Cache engagement data
-        data_cache['engagement'][access_token] = analysis_data
-        return jsonify(analysis_data)
+        dataset = get_program_dataset(access_token)
+        # Cache the program dataset; the performance view is built from it too
+        data_cache['engagement'][access_token] = dataset
+        return jsonify(get_engagement_programs_analysis_from_cache(dataset))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -604,13 +676,11 @@ def get_engagement_programs_performance_route():
     
     try:
         # Check cache first
-        cached_data = data_cache['engagement'].get(access_token)
-        if cached_data:
-            # Use cached data to generate performance metrics
-            performance_data = cached_data
-        else:
-            performance_data = get_engagement_programs_performance(access_token)
-        return jsonify(performance_data)
+        dataset = data_cache['engagement'].get(access_token)
+        if not dataset:
+            dataset = get_program_dataset(access_token)
+            data_cache['engagement'][access_token] = dataset
+        return jsonify(get_engagement_programs_performance_from_cache(dataset))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -663,7 +733,8 @@ def download_summary_pdf():
         utm_analysis = None
         
         try:
-            engagement_programs = get_engagement_programs_analysis(access_token)
+            dataset = data_cache['engagement'].get(access_token) or get_program_dataset(access_token)
+            engagement_programs = get_engagement_programs_analysis_from_cache(dataset)
         except Exception as e:
             print(f"Error fetching engagement programs: {str(e)}")
         
@@ -734,6 +805,9 @@ def export_to_sheets():
         
         title = request.json.get("title", "Stats")
         export_data = request.json.get("data", [])
+        if request.json.get("data_type") == "utm" and not export_data:
+            # UTM rows come from the last audit kept on the server rather than the analysis payload
+            export_data = get_utm_export_rows()
         
         if not export_data:
             return jsonify({"error": "No data provided"}), 400
@@ -765,6 +839,21 @@ def get_utm_analysis_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/get-utm-issues", methods=["GET"])
+def get_utm_issues_route():
+    access_token = extract_access_token(request.headers.get("Authorization"))
+    if not access_token:
+        return jsonify({"error": "Access token required"}), 401
+    
+    try:
+        issues_page = get_utm_issues_page(request.args.get("page", 1, type=int),
+                                          request.args.get("page_size", DEFAULT_PAGE_SIZE, type=int))
+        if issues_page is None:
+            return jsonify({"error": "Please run UTM analysis first"}), 400
+        return jsonify(issues_page)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/get-campaign-engagement-analysis", methods=["GET"])
 def get_campaign_engagement_analysis_route():
     try:
@@ -8,4 +8,19 @@ load_dotenv()
 REDIRECT_URI = "http://localhost:4001/callback"
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
\ No newline at end of file
+SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
+
+# Timezone of the Pardot account, used to read naive v4 timestamps (e.g. "America/Los_Angeles").
+# When unset, naive timestamps are treated as server local time.
+PARDOT_TIMEZONE = os.getenv("PARDOT_TIMEZONE")
+
+# Pardot API limits shared by every crawl in this process
+PARDOT_MAX_CONCURRENCY = int(os.getenv("PARDOT_MAX_CONCURRENCY", "5"))
+PARDOT_REQUESTS_PER_SECOND = float(os.getenv("PARDOT_REQUESTS_PER_SECOND", "10"))
+
+# Allowed UTM values per business unit: {"default": {field: [values]}, "<business unit id>": {...}}.
+# Fields a business unit lists replace the defaults; unlisted fields are only checked for presence.
+UTM_ALLOWED_VALUES_FILE = os.getenv("UTM_ALLOWED_VALUES_FILE", os.path.join(os.path.dirname(__file__), "utm_allowed_values.json"))
+
+# Directory for persisted sync state (campaign watermarks, asset catalogs)
+STATE_DIR = os.getenv("STATE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "state"))
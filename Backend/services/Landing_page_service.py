@@ -1,11 +1,15 @@
 import requests
 from concurrent.futures import ThreadPoolExecutor
-from collections import defaultdict
-from datetime import datetime, timedelta
 from utils.auth_utils import get_credentials
+from utils.date_utils import now_epoch, resolve_date_window
+from .asset_catalog import sync_catalog
+from .activity_store import ActivityStore, landing_page_activity_id
 import json
 import os
 
+LANDING_PAGE_FIELDS = "id,name,url,vanityUrl,formId,isDeleted,createdAt,updatedAt"
+ACTIVE_DAYS = 90  # Landing pages with activity in this many days are active
+
 def fetch_all_activities(headers, created_after=None, created_before=None):
     """Fetch all landing page activities with optional date filtering"""
     all_activities = []
@@ -48,22 +52,16 @@ def fetch_all_activities(headers, created_after=None, created_before=None):
     
     return all_activities
 
-def calculate_landing_page_stats(page, activities_by_page):
+def calculate_landing_page_stats(page, activity_store, active_ids, cutoff):
     """Calculate statistics for a single landing page"""
     page_id = str(page["id"])
-    page_activities = activities_by_page.get(page_id, [])
+    page_activities = activity_store.activities(page_id)
     
     # Activity types: 2=View, 4=Success (Form Submission), 1,6=Clicks
     views = [a for a in page_activities if int(a.get("type", 0)) == 2]
     submissions = [a for a in page_activities if int(a.get("type", 0)) == 4]
     clicks = [a for a in page_activities if int(a.get("type", 0)) in [1, 6]]
     
-    # Check if landing page is active (has activity in last 3 months)
-    three_months_ago = datetime.now() - timedelta(days=90)
-    recent_activities = [a for a in page_activities if a.get("created_at") and 
-                        datetime.fromisoformat(a["created_at"].replace('Z', '+00:00')) > three_months_ago]
-    is_active = len(recent_activities) > 0
-    
     return {
         "id": page_id,
         "name": page["name"],
@@ -74,9 +72,9 @@ def calculate_landing_page_stats(page, activities_by_page):
         "submissions": len(submissions),
         "clicks": len(clicks),
         "total_activities": len(page_activities),
-        "recent_activities": len(recent_activities),
-        "is_active": is_active,
-        "last_activity": max([a.get("created_at") for a in page_activities], default=None) if page_activities else None
+        "recent_activities": activity_store.recent_count(page_id, cutoff),
+        "is_active": page_id in active_ids,
+        "last_activity": activity_store.last_activity_at(page_id)
     }
 
 def get_landing_page_stats(access_token, created_after=None, created_before=None):
@@ -90,38 +88,25 @@ def get_landing_page_stats(access_token, created_after=None, created_before=None
         
         print("Fetching landing pages and activities...")
         
+        # Landing page catalog is synced by updatedAt, so only changed pages are listed again
         with ThreadPoolExecutor(max_workers=2) as executor:
-            pages_future = executor.submit(
-                requests.get,
-                "https://pi.pardot.com/api/v5/objects/landing-pages",
-                headers=headers,
-                params={"fields": "id,name,url,vanityUrl,formId,isDeleted,createdAt", "limit": 200}
-            )
+            catalog_future = executor.submit(sync_catalog, credentials['business_unit_id'], "landing-pages", LANDING_PAGE_FIELDS, headers)
             activities_future = executor.submit(fetch_all_activities, headers, created_after, created_before)
             
-            pages_response = pages_future.result()
+            pages = catalog_future.result().values()
             activities = activities_future.result()
         
-        if pages_response.status_code != 200:
-            raise Exception(f"Error fetching landing pages: {pages_response.text}")
-        
-        pages = pages_response.json().get("values", [])
-        # Filter out deleted pages
-        pages = [p for p in pages if not p.get('isDeleted')]
-        
         print(f"Found {len(pages)} active landing pages")
         print(f"Found {len(activities)} visitor activities")
         
-        # Group activities by landing page ID
-        activities_by_page = defaultdict(list)
-        for activity in activities:
-            page_id = str(activity.get("landing_page_id", "")) or str(activity.get("landing_page", {}).get("id", ""))
-            if page_id:
-                activities_by_page[page_id].append(activity)
+        # Group activities by landing page, parsing each timestamp once
+        activity_store = ActivityStore(landing_page_activity_id, activities)
+        cutoff = now_epoch() - ACTIVE_DAYS * 86400
+        active_ids = activity_store.active_ids(cutoff)
         
         # Calculate stats for each landing page
         with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(calculate_landing_page_stats, page, activities_by_page) for page in pages]
+            futures = [executor.submit(calculate_landing_page_stats, page, activity_store, active_ids, cutoff) for page in pages]
             page_stats = [future.result() for future in futures]
         
         # Filter out pages with no activities if date filters are applied
@@ -172,57 +157,13 @@ def save_all_landing_page_stats_to_file(page_stats):
         print(f"Error saving landing page stats: {str(e)}")
 
 
-def get_date_range_from_filter(filter_type):
-    """Convert filter type to date range"""
-    from datetime import datetime, timedelta
-    
-    now = datetime.now()
-    
-    if filter_type == "today":
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "yesterday":
-        yesterday = now - timedelta(days=1)
-        start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif filter_type == "last_7_days":
-        start = now - timedelta(days=7)
-        end = now
-    elif filter_type == "last_30_days":
-        start = now - timedelta(days=30)
-        end = now
-    elif filter_type == "this_month":
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "last_month":
-        if now.month == 1:
-            start = now.replace(year=now.year-1, month=12, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        else:
-            start = now.replace(month=now.month-1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-    elif filter_type == "this_quarter":
-        quarter_start_month = ((now.month - 1) // 3) * 3 + 1
-        start = now.replace(month=quarter_start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "this_year":
-        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    else:
-        return None, None
-    
-    return start.isoformat(), end.isoformat()
-
-
 def get_filtered_landing_page_stats(access_token, filter_type=None, start_date=None, end_date=None):
     """Get filtered landing page stats with date filtering"""
     try:
-        # Convert filter type to date range if provided
-        if filter_type and not start_date and not end_date:
-            start_date, end_date = get_date_range_from_filter(filter_type)
+        created_after, created_before = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
         # Fetch fresh data with date filters
-        return get_landing_page_stats(access_token, start_date, end_date)
+        return get_landing_page_stats(access_token, created_after, created_before)
     except Exception as e:
         print(f"Error in get_filtered_landing_page_stats: {str(e)}")
         raise e
\ No newline at end of file
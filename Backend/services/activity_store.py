@@ -0,0 +1,86 @@
+from array import array
+from utils.date_utils import parse_timestamp
+
+NO_ACTIVITY = -1  # last_activity value for assets with no parseable activity timestamp
+
+
+def form_activity_id(activity):
+    """Form id a v4 visitor activity belongs to"""
+    return str(activity.get("form_id", "")) or str(activity.get("form", {}).get("id", ""))
+
+
+def landing_page_activity_id(activity):
+    """Landing page id a v4 visitor activity belongs to"""
+    return str(activity.get("landing_page_id", "")) or str(activity.get("landing_page", {}).get("id", ""))
+
+
+class ActivityStore:
+    """Visitor activities grouped by asset, with each asset's newest activity kept as an epoch.
+
+    Timestamps are parsed once on ingest. last_activity holds one epoch per
+    asset position, so active/inactive classification is a single threshold
+    pass over that array instead of re-parsing every activity per asset.
+    """
+
+    def __init__(self, asset_id_of, activities=()):
+        self.asset_id_of = asset_id_of  # activity -> asset id (str), empty when unrelated
+        self.asset_ids = []  # position -> asset id
+        self._positions = {}
+        self.by_asset = []  # position -> activities
+        self.epochs = []  # position -> array of activity epochs, parallel to by_asset
+        self.last_activity = array('q')  # position -> newest activity epoch
+        self.last_activity_raw = []  # position -> created_at of that activity as Pardot sent it
+        self.ingest(activities)
+
+    def __len__(self):
+        return len(self.asset_ids)
+
+    def _position(self, asset_id):
+        position = self._positions.get(asset_id)
+        if position is None:
+            position = len(self.asset_ids)
+            self._positions[asset_id] = position
+            self.asset_ids.append(asset_id)
+            self.by_asset.append([])
+            self.epochs.append(array('q'))
+            self.last_activity.append(NO_ACTIVITY)
+            self.last_activity_raw.append(None)
+        return position
+
+    def ingest(self, activities):
+        """Add activities, updating each asset's newest activity epoch"""
+        for activity in activities:
+            asset_id = self.asset_id_of(activity)
+            if not asset_id:
+                continue
+            position = self._position(asset_id)
+            raw = activity.get("created_at")
+            epoch = parse_timestamp(raw)
+            epoch = NO_ACTIVITY if epoch is None else epoch
+            self.by_asset[position].append(activity)
+            self.epochs[position].append(epoch)
+            if epoch > self.last_activity[position]:
+                self.last_activity[position] = epoch
+                self.last_activity_raw[position] = raw
+
+    def activities(self, asset_id):
+        """Activities of one asset"""
+        position = self._positions.get(str(asset_id))
+        return self.by_asset[position] if position is not None else []
+
+    def last_activity_at(self, asset_id):
+        """created_at of an asset's newest activity, or None"""
+        position = self._positions.get(str(asset_id))
+        return self.last_activity_raw[position] if position is not None else None
+
+    def recent_count(self, asset_id, cutoff):
+        """Number of an asset's activities after cutoff (epoch seconds)"""
+        position = self._positions.get(str(asset_id))
+        if position is None or self.last_activity[position] <= cutoff:
+            return 0
+        return sum(1 for epoch in self.epochs[position] if epoch > cutoff)
+
+    def active_ids(self, cutoff):
+        """Ids of assets with any activity after cutoff (epoch seconds)"""
+        asset_ids = self.asset_ids
+        return {asset_ids[position] for position, epoch in enumerate(self.last_activity) if epoch > cutoff}
@@ -0,0 +1,125 @@
+import threading
+from utils.date_utils import parse_timestamp, now_epoch, format_iso
+from utils.pardot_client import PardotApiError, iter_pages
+from utils.state_store import load_state, save_state
+
+CATALOG_PAGE_SIZE = 1000
+RECONCILE_INTERVAL = 24 * 3600  # Seconds between full re-lists, which also drop hard-deleted assets
+
+
+class AssetCatalog:
+    """Local copy of one v5 asset endpoint for a business unit, kept current by updatedAt syncs.
+
+    The first sync lists the endpoint in full; later syncs only ask for
+    records updated since the watermark (deleted ones included, so they can
+    be dropped). The catalog is persisted, so a restart resumes from the
+    watermark instead of re-listing every asset.
+    """
+
+    def __init__(self, endpoint, fields, state=None):
+        state = state or {}
+        if state.get("fields") != fields:
+            state = {}  # Field list changed since the catalog was saved; start over
+        self.endpoint = endpoint
+        self.fields = fields
+        self.items = state.get("items", {})  # asset id (str) -> record
+        self.watermark = state.get("watermark")  # updatedAt of the newest record seen, as sent to Pardot
+        self.reconciled_at = state.get("reconciled_at", 0)
+        self.incremental = state.get("incremental", True)  # False when the endpoint rejects updatedAt filters
+        self.lock = threading.Lock()
+
+    def to_state(self):
+        return {
+            "fields": self.fields,
+            "items": self.items,
+            "watermark": self.watermark,
+            "reconciled_at": self.reconciled_at,
+            "incremental": self.incremental
+        }
+
+    def get(self, asset_id):
+        """Record for an asset id, or None"""
+        return self.items.get(str(asset_id))
+
+    def values(self):
+        """Every live record in the catalog"""
+        return list(self.items.values())
+
+    def _read(self, headers, params, items):
+        """Fold every page of a query into items, returning the newest updatedAt epoch seen"""
+        newest = -1
+        for page in iter_pages(self.endpoint, headers, params):
+            for record in page:
+                key = str(record.get("id"))
+                if record.get("isDeleted"):
+                    items.pop(key, None)
+                else:
+                    items[key] = record
+                newest = max(newest, parse_timestamp(record.get("updatedAt")) or -1)
+        return newest
+
+    def sync(self, headers):
+        """Bring the catalog up to date, returning whether its records or watermark changed"""
+        with self.lock:
+            started = now_epoch()
+            params = {"fields": self.fields, "limit": CATALOG_PAGE_SIZE}
+            full = not self.incremental or self.watermark is None or started - self.reconciled_at >= RECONCILE_INTERVAL
+            was_incremental = self.incremental
+
+            # Copy on write so readers never see a half-applied sync
+            items = dict(self.items)
+            newest = -1
+            if not full:
+                try:
+                    # Inclusive bound: records sharing the watermark second are read again and overwrite themselves
+                    newest = self._read(headers, {**params, "updatedAtAfterOrEqualTo": self.watermark, "deleted": "all"}, items)
+                except PardotApiError as e:
+                    if e.status_code != 400:
+                        raise
+                    print(f"{self.endpoint} does not accept updatedAt filters, listing in full")
+                    self.incremental = False
+                    full = True
+
+            if full:
+                items = {}
+                newest = self._read(headers, params, items)
+                if newest < 0:
+                    newest = started  # Empty endpoint; later syncs only look for new records
+                self.reconciled_at = started
+
+            added = len(items) - len(self.items)
+            # Unchanged records are the same objects in both dicts, so this is an identity check for most of them
+            changed = items != self.items or was_incremental != self.incremental
+            self.items = items
+            if newest >= 0:
+                # Never past the crawl start, so records updated mid-crawl are read again next time
+                watermark = format_iso(min(newest, started))
+                changed = changed or watermark != self.watermark
+                self.watermark = watermark
+            print(f"{self.endpoint} catalog sync ({'full' if full else 'incremental'}): {len(self.items)} assets ({added:+d})")
+            return changed
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _state_name(business_unit_id, endpoint):
+    return f"catalog_{endpoint}_{business_unit_id}"
+
+
+def get_catalog(business_unit_id, endpoint, fields):
+    """Catalog of an endpoint for a business unit, loaded from the state store on first use"""
+    key = (business_unit_id, endpoint)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = AssetCatalog(endpoint, fields, load_state(_state_name(business_unit_id, endpoint)))
+        return _catalogs[key]
+
+
+def sync_catalog(business_unit_id, endpoint, fields, headers):
+    """Sync an endpoint's catalog and persist it when anything changed"""
+    catalog = get_catalog(business_unit_id, endpoint, fields)
+    if catalog.sync(headers):
+        save_state(_state_name(business_unit_id, endpoint), catalog.to_state())
+    return catalog
@@ -0,0 +1,284 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.date_utils import parse_timestamp, now_epoch, format_iso, to_datetime
+from utils.pardot_client import PardotApiError, iter_pages
+from utils.state_store import load_state, save_state
+from .email_service import sync_list_email_catalog
+
+DAY = 86400
+MONTH = 30 * DAY  # Campaign activity windows count months as 30 days
+MAX_MONTHS_BACK = 24  # Longest window the engagement analysis offers
+
+# Asset type -> v5 endpoint holding assets tagged with a campaignId
+CAMPAIGN_ASSET_ENDPOINTS = {
+    "prospects": "prospects",
+    "emails": "list-emails",
+    "forms": "forms",
+    "landing_pages": "landing-pages",
+    "custom_redirects": "custom-redirects",
+    "files": "files"
+}
+
+# Asset types too large to crawl in full; the first sync only reads the last MAX_MONTHS_BACK months
+WINDOWED_ASSET_TYPES = {"prospects"}
+
+# Asset types read from a shared asset catalog (business unit, headers -> catalog) instead of crawled here
+CATALOG_ASSET_TYPES = {
+    "emails": sync_list_email_catalog
+}
+
+ASSET_FIELDS = "id,campaignId,createdAt"
+ASSET_PAGE_SIZE = 1000
+CAMPAIGN_FIELDS = "id,name,createdAt,updatedAt,cost"
+
+SYNC_INTERVAL = 300  # Seconds an index sync is reused before asking Pardot for new assets again
+TREND_MONTHS = 12  # Months of history in each campaign's trend
+
+
+def month_key(epoch):
+    """Calendar month ("YYYY-MM") of an epoch in the Pardot account timezone"""
+    moment = to_datetime(epoch)
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def recent_months(count, now=None):
+    """The last `count` calendar month keys, oldest first, ending with the current month"""
+    moment = to_datetime(now if now is not None else now_epoch())
+    year, month = moment.year, moment.month
+    keys = []
+    for _ in range(count):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return keys[::-1]
+
+
+def fetch_all_campaigns(headers):
+    """Fetch all Pardot campaigns"""
+    all_campaigns = []
+    for page in iter_pages("campaigns", headers, {"fields": CAMPAIGN_FIELDS, "limit": 1000}):
+        all_campaigns.extend(page)
+    return all_campaigns
+
+
+class CampaignActivityIndex:
+    """Per-campaign asset rollups plus a createdAt watermark per asset type.
+
+    For every campaign the index keeps the newest asset createdAt and a
+    table of new assets per calendar month and asset type, so any window,
+    trend or last-touched date is a lookup. Everything survives restarts
+    through the state store, so after the first sync each asset endpoint is
+    only asked for assets created since its watermark.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.latest = state.get("latest", {})  # campaign id (str) -> newest asset createdAt epoch
+        self.monthly = state.get("monthly", {})  # campaign id -> {"YYYY-MM": {asset type: new assets}}
+        self.watermarks = state.get("watermarks", {})  # asset type -> newest createdAt epoch fetched
+        self.boundary_ids = state.get("boundary_ids", {})  # asset type -> ids created at the watermark second
+        self.unfiltered = set(state.get("unfiltered", []))  # asset types whose endpoint rejects createdAt filters
+        self.campaigns = state.get("campaigns", [])
+        self.synced_at = state.get("synced_at", 0)
+        self.asset_counts = {}  # asset type -> new assets indexed by the last sync
+        self.errors = {}  # asset type -> fetch error from the last sync
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def to_state(self):
+        with self.lock:
+            return {
+                "latest": self.latest,
+                "monthly": self.monthly,
+                "watermarks": self.watermarks,
+                "boundary_ids": self.boundary_ids,
+                "unfiltered": sorted(self.unfiltered),
+                "campaigns": self.campaigns,
+                "synced_at": self.synced_at
+            }
+
+    def new_batch(self, asset_type):
+        """Empty batch for one asset type, starting from its current watermark"""
+        return AssetBatch(asset_type, self.watermarks.get(asset_type, -1), self.boundary_ids.get(asset_type, []))
+
+    def merge(self, batch):
+        """Fold a completed batch into the rollups and advance its asset type's watermark"""
+        with self.lock:
+            latest = self.latest
+            for key, created in batch.latest.items():
+                if created > latest.get(key, -1):
+                    latest[key] = created
+            for key, months in batch.monthly.items():
+                campaign_months = self.monthly.setdefault(key, {})
+                for month, count in months.items():
+                    counts = campaign_months.setdefault(month, {})
+                    counts[batch.asset_type] = counts.get(batch.asset_type, 0) + count
+            self.asset_counts[batch.asset_type] = self.asset_counts.get(batch.asset_type, 0) + batch.added
+            if batch.newest >= 0:
+                self.watermarks[batch.asset_type] = batch.newest
+                self.boundary_ids[batch.asset_type] = sorted(batch.newest_ids, key=str)
+
+    def last_activity(self, campaign_id):
+        """Newest asset createdAt epoch for a campaign, or None"""
+        return self.latest.get(str(campaign_id))
+
+    def is_active(self, campaign_id, months_back, now=None):
+        """Whether the campaign has an asset created in the last months_back months"""
+        now = now if now is not None else now_epoch()
+        created = self.latest.get(str(campaign_id))
+        return created is not None and created > now - int(months_back) * MONTH
+
+    def monthly_totals(self, campaign_id, month_keys):
+        """New assets of any type per month, in the order of month_keys"""
+        months = self.monthly.get(str(campaign_id), {})
+        return [sum(months.get(key, {}).values()) for key in month_keys]
+
+    def assets_by_type(self, campaign_id, month_keys):
+        """New assets per type summed over month_keys"""
+        months = self.monthly.get(str(campaign_id), {})
+        totals = {}
+        for key in month_keys:
+            for asset_type, count in months.get(key, {}).items():
+                totals[asset_type] = totals.get(asset_type, 0) + count
+        return totals
+
+
+class AssetBatch:
+    """Assets of one type read during a sync, held apart from the index until the read succeeds.
+
+    Assets created before the watermark, or at it with an id in
+    counted_at_mark, were rolled up by an earlier sync and are not counted
+    again. A failed read discards the batch, so re-reading those pages next
+    time never counts them twice.
+    """
+
+    def __init__(self, asset_type, after=-1, counted_at_mark=()):
+        self.asset_type = asset_type
+        self.after = after
+        self.counted_at_mark = set(counted_at_mark)
+        self.latest = {}  # campaign id (str) -> newest asset createdAt epoch in the batch
+        self.monthly = {}  # campaign id -> {"YYYY-MM": new assets}
+        self.added = 0
+        self.newest = after  # Newest createdAt read, and the ids created at that second
+        self.newest_ids = set(self.counted_at_mark)
+
+    def add(self, assets):
+        """Fold a page of {id, campaignId, createdAt} assets into the batch"""
+        for asset in assets:
+            created = parse_timestamp(asset.get("createdAt"))
+            if created is None:
+                continue
+            asset_id = asset.get("id")
+            if created > self.newest:
+                self.newest, self.newest_ids = created, {asset_id}
+            elif created == self.newest:
+                self.newest_ids.add(asset_id)
+
+            campaign_id = asset.get("campaignId")
+            if campaign_id is None:
+                continue
+            key = str(campaign_id)
+            if created > self.latest.get(key, -1):
+                self.latest[key] = created
+            if created > self.after or (created == self.after and asset_id not in self.counted_at_mark):
+                months = self.monthly.setdefault(key, {})
+                month = month_key(created)
+                months[month] = months.get(month, 0) + 1
+                self.added += 1
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _state_name(business_unit_id):
+    return f"campaign_activity_{business_unit_id}"
+
+
+def get_campaign_index(business_unit_id):
+    """Campaign index for a business unit, loaded from the state store on first use"""
+    with _indexes_lock:
+        if business_unit_id not in _indexes:
+            _indexes[business_unit_id] = CampaignActivityIndex(load_state(_state_name(business_unit_id)))
+        return _indexes[business_unit_id]
+
+
+def _crawl_endpoint(index, headers, asset_type, endpoint, now):
+    """Stream one endpoint's new assets into the index, advancing its watermark only on success"""
+    since = index.watermarks.get(asset_type)
+    if since is None and asset_type in WINDOWED_ASSET_TYPES:
+        since = now - MAX_MONTHS_BACK * MONTH
+
+    params = {"fields": ASSET_FIELDS, "limit": ASSET_PAGE_SIZE}
+    if since is not None and asset_type not in index.unfiltered:
+        # Inclusive bound: assets sharing the watermark second are re-read and skipped via boundary_ids
+        params["createdAtAfterOrEqualTo"] = format_iso(since)
+
+    def read(query):
+        batch = index.new_batch(asset_type)
+        for page in iter_pages(endpoint, headers, query):
+            batch.add(page)
+        return batch
+
+    try:
+        try:
+            batch = read(params)
+        except PardotApiError as e:
+            if "createdAtAfterOrEqualTo" not in params or e.status_code != 400:
+                raise
+            # Endpoint rejects the createdAt filter; read it in full instead
+            print(f"{endpoint} does not accept createdAt filters, crawling in full")
+            index.unfiltered.add(asset_type)
+            del params["createdAtAfterOrEqualTo"]
+            batch = read(params)
+    except Exception as e:
+        # One unreadable asset type should not sink the whole analysis
+        print(f"Error fetching {asset_type} for campaign index: {str(e)}")
+        index.errors[asset_type] = str(e)
+        return
+
+    index.merge(batch)
+
+
+def _index_catalog(index, business_unit_id, headers, asset_type):
+    """Fold a synced asset catalog into the index; assets at or before the watermark are not counted again"""
+    try:
+        catalog = CATALOG_ASSET_TYPES[asset_type](business_unit_id, headers)
+    except Exception as e:
+        print(f"Error fetching {asset_type} for campaign index: {str(e)}")
+        index.errors[asset_type] = str(e)
+        return
+
+    batch = index.new_batch(asset_type)
+    batch.add(catalog.values())
+    index.merge(batch)
+
+
+def sync_campaign_index(business_unit_id, headers, max_age=SYNC_INTERVAL):
+    """Fetch campaigns and assets created since each endpoint's watermark, all endpoints concurrently.
+
+    Each endpoint's pages are gathered into a batch that is merged once the
+    endpoint finishes, and requests share the Pardot rate limiter, so wall
+    time approaches the slowest single endpoint. An index synced less than
+    max_age seconds ago is returned as is, unless an endpoint failed in that
+    sync. The updated index is persisted for the next run.
+    """
+    index = get_campaign_index(business_unit_id)
+    with index.sync_lock:
+        now = now_epoch()
+        if index.campaigns and not index.errors and now - index.synced_at < max_age:
+            return index
+
+        index.asset_counts = {}
+        index.errors = {}
+        with ThreadPoolExecutor(max_workers=len(CAMPAIGN_ASSET_ENDPOINTS) + 1) as executor:
+            campaigns_future = executor.submit(fetch_all_campaigns, headers)
+            for asset_type, endpoint in CAMPAIGN_ASSET_ENDPOINTS.items():
+                if asset_type in CATALOG_ASSET_TYPES:
+                    executor.submit(_index_catalog, index, business_unit_id, headers, asset_type)
+                else:
+                    executor.submit(_crawl_endpoint, index, headers, asset_type, endpoint, now)
+            index.campaigns = campaigns_future.result()
+        index.synced_at = now
+        save_state(_state_name(business_unit_id), index.to_state())
+        print(f"Campaign index sync: {index.asset_counts} new assets, {len(index.latest)} campaigns tracked")
+    return index
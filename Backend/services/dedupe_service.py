@@ -0,0 +1,196 @@
+import hashlib
+from collections import defaultdict
+
+# Mailbox providers that ignore dots in the local part of an address
+DOT_INSENSITIVE_DOMAINS = {"gmail.com", "googlemail.com"}
+
+# Domains that deliver to the same mailbox
+DOMAIN_ALIASES = {"googlemail.com": "gmail.com"}
+
+# Near-duplicate matching settings
+FUZZY_SIMILARITY_THRESHOLD = 0.75
+MAX_BLOCK_SIZE = 50  # Larger blocks (common names/companies) are split on finer keys to stay linear
+
+
+def normalize_email(email):
+    """Normalize an email address so aliases of one mailbox share a key"""
+    email = (email or "").strip().lower()
+    if "@" not in email:
+        return email
+
+    local, _, domain = email.rpartition("@")
+    domain = DOMAIN_ALIASES.get(domain, domain)
+
+    # Plus-addressing: john+news@x.com delivers to john@x.com
+    local = local.split("+", 1)[0]
+    if domain in DOT_INSENSITIVE_DOMAINS:
+        local = local.replace(".", "")
+
+    return f"{local}@{domain}"
+
+
+def email_key(email):
+    """Hash a normalized email into a compact fixed-size index key"""
+    normalized = normalize_email(email)
+    if not normalized:
+        return None
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+def _trigrams(text):
+    """Character trigrams of a normalized string"""
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(a, b):
+    """Jaccard similarity between two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _clean(value):
+    return " ".join(str(value or "").lower().split())
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _blocking_keys(first, last, company):
+    """Cheap keys that near-duplicate records are likely to share"""
+    keys = []
+    if last and first:
+        keys.append(f"n|{last}|{first[:1]}")
+    if last and company:
+        keys.append(f"c|{company}|{last[:3]}")
+    return keys
+
+
+def _refining_keys(first, last, company):
+    """Progressively finer keys for splitting an oversized block; the last one is the full name and company"""
+    return (first[:3], f"{first[:3]}|{company[:3]}", f"{first}|{last}|{company}")
+
+
+def find_duplicate_clusters(prospects, fuzzy=False):
+    """Cluster duplicate prospects by normalized email and optionally by name + company similarity.
+
+    Records are streamed once through a hashed email index; the optional fuzzy
+    pass only compares records sharing a blocking key, so the work stays
+    roughly linear in the number of prospects. Blocks over MAX_BLOCK_SIZE are
+    split on first-name and company prefixes until they are small enough.
+    """
+    ids = []
+    key_index = defaultdict(list)
+    first_email = {}
+    blocks = defaultdict(list) if fuzzy else None
+    profiles = [] if fuzzy else None
+    refinements = [] if fuzzy else None
+
+    for position, prospect in enumerate(prospects):
+        ids.append(prospect.get("id"))
+
+        key = email_key(prospect.get("email"))
+        if key is not None:
+            key_index[key].append(position)
+            first_email.setdefault(key, normalize_email(prospect.get("email")))
+
+        if fuzzy:
+            first = _clean(prospect.get("firstName"))
+            last = _clean(prospect.get("lastName"))
+            company = _clean(prospect.get("company"))
+            profiles.append(_trigrams(f"{first} {last} {company}") if first or last else None)
+            refinements.append(_refining_keys(first, last, company))
+            for block_key in _blocking_keys(first, last, company):
+                blocks[block_key].append(position)
+
+    union_find = _UnionFind(len(ids))
+    fuzzy_roots = set()
+    cluster_emails = {}
+
+    for key, positions in key_index.items():
+        if len(positions) > 1:
+            for position in positions[1:]:
+                union_find.union(positions[0], position)
+            cluster_emails[positions[0]] = first_email[key]
+
+    if fuzzy:
+        pending = [(positions, 0) for positions in blocks.values() if len(positions) > 1]
+        while pending:
+            positions, level = pending.pop()
+            if len(positions) > MAX_BLOCK_SIZE:
+                if level < len(refinements[positions[0]]):
+                    sub_blocks = defaultdict(list)
+                    for position in positions:
+                        sub_blocks[refinements[position][level]].append(position)
+                    pending.extend((sub_block, level + 1) for sub_block in sub_blocks.values() if len(sub_block) > 1)
+                    continue
+                # Same first name, last name and company throughout, so every pair matches
+                for b in positions[1:]:
+                    if union_find.find(positions[0]) != union_find.find(b):
+                        union_find.union(positions[0], b)
+                        fuzzy_roots.add(min(positions[0], b))
+                continue
+            for i, a in enumerate(positions):
+                for b in positions[i + 1:]:
+                    if union_find.find(a) == union_find.find(b):
+                        continue
+                    if _similarity(profiles[a], profiles[b]) >= FUZZY_SIMILARITY_THRESHOLD:
+                        union_find.union(a, b)
+                        fuzzy_roots.add(min(a, b))
+
+    members = defaultdict(list)
+    for position in range(len(ids)):
+        members[union_find.find(position)].append(position)
+
+    fuzzy_clusters = {union_find.find(root) for root in fuzzy_roots}
+    email_clusters = {union_find.find(position): email for position, email in cluster_emails.items()}
+
+    clusters = []
+    for root in sorted(members):
+        positions = members[root]
+        if len(positions) < 2:
+            continue
+        prospect_ids = [ids[p] for p in positions]
+        clusters.append({
+            # Row positions shift between syncs, so clusters are named and ordered by their lowest prospect id
+            "cluster_id": min(prospect_ids),
+            "email": email_clusters.get(root, ""),
+            "match": "fuzzy" if root in fuzzy_clusters else "email",
+            "count": len(positions),
+            "prospect_ids": prospect_ids
+        })
+
+    clusters.sort(key=lambda cluster: cluster["cluster_id"])
+    return clusters
+
+
+def expand_duplicate_clusters(clusters, prospects):
+    """Attach prospect details to compact duplicate clusters for display"""
+    by_id = {p.get("id"): p for p in prospects}
+    expanded = []
+
+    for cluster in clusters:
+        group = dict(cluster)
+        group["prospects"] = [{
+            "id": prospect_id,
+            "firstName": by_id.get(prospect_id, {}).get("firstName", ""),
+            "lastName": by_id.get(prospect_id, {}).get("lastName", ""),
+            "createdAt": by_id.get(prospect_id, {}).get("createdAt", "")
+        } for prospect_id in cluster["prospect_ids"]]
+        expanded.append(group)
+
+    return expanded
@@ -1,37 +1,14 @@
 import requests
-from datetime import datetime, timezone, timedelta
 from utils.auth_utils import get_credentials
+from utils.date_utils import resolve_date_window
+from .asset_catalog import sync_catalog
 
-def fetch_all_mails(access_token, fields="id,name,subject,createdAt"):
-    """Fetch all emails without date filtering"""
-    try:
-        credentials = get_credentials()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": credentials['business_unit_id']
-        }
-        
-        all_mails = []
-        url = "https://pi.pardot.com/api/v5/objects/list-emails"
-        params = {"fields": fields, "limit": 200}
-        
-        while url:
-            response = requests.get(url, headers=headers, params=params if url.endswith("list-emails") else None)
-            
-            if response.status_code != 200:
-                print(f"API Error: {response.text}")
-                break
+# Catalog fields; campaignId lets the campaign index read list emails from the same catalog
+LIST_EMAIL_FIELDS = "id,name,subject,campaignId,isDeleted,createdAt,updatedAt"
 
-            data = response.json()
-            emails = data.get("values", [])
-            all_mails.extend(emails)
-            url = data.get("nextPageUrl")
-
-        return all_mails
-        
-    except Exception as e:
-        print(f"Error in fetch_all_mails: {str(e)}")
-        return []
+def sync_list_email_catalog(business_unit_id, headers):
+    """Bring the list email catalog up to date; records are looked up by id with catalog.get()"""
+    return sync_catalog(business_unit_id, "list-emails", LIST_EMAIL_FIELDS, headers)
 
 def fetch_visitor_activities(access_token, filter_start=None, filter_end=None):
     """Fetch email visitor activities using v4 API with email_only parameter"""
@@ -87,12 +64,15 @@ def fetch_visitor_activities(access_token, filter_start=None, filter_end=None):
 
 def _get_email_stats_internal(access_token, filter_start=None, filter_end=None):
     try:
-        list_emails = fetch_all_mails(access_token)
+        credentials = get_credentials()
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Pardot-Business-Unit-Id": credentials['business_unit_id']
+        }
+        # Names and subjects come from the list email catalog, refreshed incrementally
+        email_catalog = sync_list_email_catalog(credentials['business_unit_id'], headers)
         visitor_activities = fetch_visitor_activities(access_token, filter_start, filter_end)
 
-        # Create email lookup dictionary
-        email_lookup = {email['id']: email for email in list_emails}
-
         # Count stats for each email
         email_stats = {}
         unique_trackers = {}  # Track unique opens/clicks per email
@@ -149,7 +129,7 @@ def _get_email_stats_internal(access_token, filter_start=None, filter_end=None):
         # Build results - only include emails that exist in list_emails AND have activities
         results = []
         for email_id, stats in email_stats.items():
-            email_info = email_lookup.get(email_id)
+            email_info = email_catalog.get(email_id)
             
             # Only include if email exists in list_emails endpoint
             if email_info:
@@ -171,28 +151,8 @@ def _get_email_stats_internal(access_token, filter_start=None, filter_end=None):
 def get_email_stats(access_token, filter_type=None, start_date=None, end_date=None):
     """Main function to get email statistics with date filtering"""
     try:
-        # Calculate date range for activity filtering
-        now = datetime.now(timezone.utc)
-        
-        if filter_type == "custom" and start_date and end_date:
-            filter_start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-            filter_end = datetime.fromisoformat(end_date.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-        elif filter_type == "last_7_days":
-            filter_start = (now - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
-            filter_end = now.strftime('%Y-%m-%d %H:%M:%S')
-        elif filter_type == "last_30_days":
-            filter_start = (now - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-            filter_end = now.strftime('%Y-%m-%d %H:%M:%S')
-        elif filter_type == "last_3_months":
-            filter_start = (now - timedelta(days=90)).strftime('%Y-%m-%d %H:%M:%S')
-            filter_end = now.strftime('%Y-%m-%d %H:%M:%S')
-        elif filter_type == "last_6_months":
-            filter_start = (now - timedelta(days=180)).strftime('%Y-%m-%d %H:%M:%S')
-            filter_end = now.strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            # If no filter specified, get all activities (no date filter)
-            filter_start = None
-            filter_end = None
+        # No filter means all activities (open window)
+        filter_start, filter_end = resolve_date_window(filter_type, start_date, end_date).as_v4()
         
         return _get_email_stats_internal(access_token, filter_start, filter_end)
         
@@ -1,103 +1,152 @@
-import requests
-
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import PARDOT_MAX_CONCURRENCY
 from utils.auth_utils import get_credentials
+from utils.pardot_client import iter_pages, get_object
+from utils.state_store import load_state, save_state
+
+PROGRAM_FIELDS = "id,name,status,isDeleted,createdAt,updatedAt,description,folderId"
+# Extra fields read from each program's own record
+PROGRAM_DETAIL_FIELDS = PROGRAM_FIELDS + ",recipientListIds,suppressionListIds,businessHours,scheduleCreatedAt,createdById,updatedById"
+PROGRAM_PAGE_SIZE = 1000
+
+_program_details = {}  # business unit id -> {program id (str): {"updatedAt": ..., "detail": {...}}}
+_program_details_lock = threading.Lock()  # Held for a whole sync so concurrent routes don't fetch the same details
+
+
+def _state_name(business_unit_id):
+    return f"engagement_programs_{business_unit_id}"
+
+
+def fetch_all_programs(headers):
+    """Fetch every engagement program, following nextPageUrl"""
+    programs = []
+    for page in iter_pages("engagement-studio-programs", headers, {"fields": PROGRAM_FIELDS, "limit": PROGRAM_PAGE_SIZE}):
+        programs.extend(page)
+    return programs
+
+
+def fetch_program_metrics(headers, business_unit_id):
+    """All programs merged with their detail records, fetching details only for programs whose updatedAt changed.
+
+    Detail requests fan out across PARDOT_MAX_CONCURRENCY workers under the
+    shared rate limiter. Details are cached by updatedAt and persisted, so
+    unchanged programs are never re-fetched, even after a restart. Returns
+    the merged programs and the number of details fetched.
+    """
+    programs = fetch_all_programs(headers)
+
+    with _program_details_lock:
+        if business_unit_id not in _program_details:
+            _program_details[business_unit_id] = load_state(_state_name(business_unit_id), {})
+        cache = _program_details[business_unit_id]
+
+        stale = [program for program in programs
+                 if cache.get(str(program["id"]), {}).get("updatedAt") != program.get("updatedAt")]
+        with ThreadPoolExecutor(max_workers=PARDOT_MAX_CONCURRENCY) as executor:
+            futures = [executor.submit(get_object, "engagement-studio-programs", program["id"], headers,
+                                       {"fields": PROGRAM_DETAIL_FIELDS})
+                       for program in stale]
+            for program, future in zip(stale, futures):
+                try:
+                    cache[str(program["id"])] = {"updatedAt": program.get("updatedAt"), "detail": future.result()}
+                except Exception as e:
+                    # Fall back to the list record; the detail is retried next run
+                    print(f"Error fetching engagement program {program['id']}: {str(e)}")
+
+        listed = {str(program["id"]) for program in programs}
+        removed = [program_id for program_id in cache if program_id not in listed]
+        for program_id in removed:
+            del cache[program_id]
+
+        if stale or removed:
+            save_state(_state_name(business_unit_id), cache)
+
+        merged = [{**program, **cache.get(str(program["id"]), {}).get("detail", {})} for program in programs]
+
+    print(f"Engagement programs: {len(programs)} listed, {len(stale)} details fetched")
+    return merged, len(stale)
+
+
+def get_program_dataset(access_token):
+    """Fetch the engagement program dataset both program views are built from"""
+    credentials = get_credentials()
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Pardot-Business-Unit-Id": credentials['business_unit_id']
+    }
+    programs, fetched = fetch_program_metrics(headers, credentials['business_unit_id'])
+    return {"programs": programs, "details_fetched": fetched}
+
+
+def get_engagement_programs_analysis_from_cache(dataset):
+    """Analyze engagement programs using a cached program dataset"""
+    programs = dataset["programs"]
+
+    # Analyze program performance
+    low_completion_programs = []
+    no_entry_programs = []
+    active_programs = [p for p in programs if p.get("status") == "Running" and not p.get("isDeleted")]
+    inactive_programs = [p for p in programs if p.get("status") != "Running" or p.get("isDeleted")]
+
+    # Categorize programs
+    for program in programs:
+        if program.get("status") == "Paused":
+            no_entry_programs.append(program)
+        elif program.get("isDeleted"):
+            low_completion_programs.append(program)
+
+    return {
+        "summary": {
+            "total_programs": len(programs),
+            "active_count": len(active_programs),
+            "inactive_count": len(inactive_programs),
+            "low_completion_count": len(low_completion_programs),
+            "no_entry_count": len(no_entry_programs)
+        },
+        "active_programs": active_programs,
+        "inactive_programs": inactive_programs,
+        "low_completion_programs": low_completion_programs,
+        "no_entry_programs": no_entry_programs
+    }
+
+def get_engagement_programs_performance_from_cache(dataset):
+    """Get performance metrics using a cached program dataset"""
+    programs = dataset["programs"]
+    fetched = dataset["details_fetched"]
+
+    # Build performance data from the list and detail fields
+    performance_data = []
+    for program in programs:
+        recipient_lists = program.get("recipientListIds") or []
+        suppression_lists = program.get("suppressionListIds") or []
+        performance_data.append({
+            "id": program["id"],
+            "name": program["name"],
+            "status": program.get("status"),
+            "is_deleted": program.get("isDeleted", False),
+            "created_at": program.get("createdAt"),
+            "updated_at": program.get("updatedAt"),
+            "description": program.get("description"),
+            "folder_id": program.get("folderId"),
+            "recipient_list_ids": recipient_lists,
+            "suppression_list_ids": suppression_lists,
+            "recipient_list_count": len(recipient_lists),
+            "suppression_list_count": len(suppression_lists),
+            "business_hours": program.get("businessHours"),
+            "schedule_created_at": program.get("scheduleCreatedAt")
+        })
+
+    top_performers = performance_data[:10]
 
-def get_engagement_programs_analysis(access_token):
-    """Analyze engagement programs for completion rates and entries"""
-    try:
-        credentials = get_credentials()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": credentials['business_unit_id']
-        }
-        
-        # Fetch engagement programs
-        programs_response = requests.get(
-            "https://pi.pardot.com/api/v5/objects/engagement-studio-programs",
-            headers=headers,
-            params={"fields": "id,name,status,isDeleted,createdAt,updatedAt,description,folderId", "limit": 200}
-        )
-        
-        if programs_response.status_code != 200:
-            raise Exception(f"Error fetching engagement programs: {programs_response.text}")
-        
-        programs = programs_response.json().get("values", [])
-        
-        # Analyze program performance
-        low_completion_programs = []
-        no_entry_programs = []
-        active_programs = [p for p in programs if p.get("status") == "Running" and not p.get("isDeleted")]
-        inactive_programs = [p for p in programs if p.get("status") != "Running" or p.get("isDeleted")]
-        
-        # Categorize programs
-        for program in programs:
-            if program.get("status") == "Paused":
-                no_entry_programs.append(program)
-            elif program.get("isDeleted"):
-                low_completion_programs.append(program)
-        
-        return {
-            "summary": {
-                "total_programs": len(programs),
-                "active_count": len(active_programs),
-                "inactive_count": len(inactive_programs),
-                "low_completion_count": len(low_completion_programs),
-                "no_entry_count": len(no_entry_programs)
-            },
-            "active_programs": active_programs,
-            "inactive_programs": inactive_programs,
-            "low_completion_programs": low_completion_programs,
-            "no_entry_programs": no_entry_programs
-        }
-    except Exception as e:
-        print(f"Error in get_engagement_programs_analysis: {str(e)}")
-        raise e
-
-def get_engagement_programs_performance(access_token):
-    """Get detailed performance metrics for engagement programs"""
-    try:
-        credentials = get_credentials()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": credentials['business_unit_id']
-        }
-        
-        # Fetch engagement program statistics
-        stats_response = requests.get(
-            "https://pi.pardot.com/api/v5/objects/engagement-studio-programs",
-            headers=headers,
-            params={"fields": "id,name,status,isDeleted,createdAt,updatedAt,description,folderId", "limit": 200}
-        )
-        
-        if stats_response.status_code != 200:
-            raise Exception(f"Error fetching program statistics: {stats_response.text}")
-        
-        programs = stats_response.json().get("values", [])
-        
-        # Build performance data with available fields
-        performance_data = []
-        for program in programs:
-            performance_data.append({
-                "id": program["id"],
-                "name": program["name"],
-                "status": program.get("status"),
-                "is_deleted": program.get("isDeleted", False),
-                "created_at": program.get("createdAt"),
-                "updated_at": program.get("updatedAt"),
-                "description": program.get("description"),
-                "folder_id": program.get("folderId")
-            })
-        
-        top_performers = performance_data[:10]
-        
-        return {
-            "performance_summary": {
-                "total_programs": len(programs),
-                "note": "Detailed metrics require additional API calls"
-            },
-            "all_programs": performance_data,
-            "top_performers": top_performers
-        }
-    except Exception as e:
-        print(f"Error in get_engagement_programs_performance: {str(e)}")
-        raise e
\ No newline at end of file
+    return {
+        "performance_summary": {
+            "total_programs": len(programs),
+            "running_count": len([p for p in performance_data if p["status"] == "Running" and not p["is_deleted"]]),
+            "without_recipients_count": len([p for p in performance_data if not p["recipient_list_count"]]),
+            "details_fetched": fetched,
+            "details_cached": len(programs) - fetched
+        },
+        "all_programs": performance_data,
+        "top_performers": top_performers
+    }
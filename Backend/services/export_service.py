@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from .prospect_service import get_health_detail_items, render_health_detail
+from .prospect_snapshot import COLUMNS
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CHUNK_ROWS = 500  # Rows per streamed chunk
+
+PROSPECT_COLUMNS = ["id"] + [field for field, _ in COLUMNS.values()]
+
+# Export list -> CSV columns
+EXPORT_COLUMNS = {
+    "filtered": PROSPECT_COLUMNS,
+    "duplicates": ["cluster_id", "email", "match", "id", "firstName", "lastName", "createdAt"],
+    "inactive": ["id", "email", "firstName", "lastName", "lastActivityAt", "daysSinceActivity"],
+    "missing_fields": ["id", "email", "firstName", "lastName", "missingFields"],
+    "scoring_issues": ["id", "email", "firstName", "lastName", "score", "issue", "lastActivityAt"],
+}
+
+
+def iter_prospect_rows(snapshot, prospect_ids, lock):
+    """Yield prospect records by id in chunks, each rendered under the store lock"""
+    for start in range(0, len(prospect_ids), CHUNK_ROWS):
+        with lock:
+            # Skip prospects a sync deleted while the export was streaming
+            rows = [snapshot.record(prospect_id) for prospect_id in prospect_ids[start:start + CHUNK_ROWS]
+                    if snapshot.position(prospect_id) is not None]
+        yield from rows
+
+
+def iter_health_rows(snapshot, health_index, list_type, lock, thresholds=None):
+    """Yield health detail rows in chunks, flattening duplicate clusters to one row per prospect.
+
+    The list is resolved and each chunk rendered under the store lock, which
+    is released between chunks so a slow download never blocks a sync.
+    """
+    with lock:
+        items = get_health_detail_items(snapshot, health_index, list_type, thresholds)
+    for start in range(0, len(items), CHUNK_ROWS):
+        batch = items[start:start + CHUNK_ROWS]
+        with lock:
+            if list_type != "duplicates":
+                # Skip prospects a sync deleted while the export was streaming
+                batch = [prospect_id for prospect_id in batch if snapshot.position(prospect_id) is not None]
+            rendered = render_health_detail(snapshot, health_index, list_type, batch)
+        for row in rendered:
+            if list_type != "duplicates":
+                yield row
+                continue
+            for prospect in row["prospects"]:
+                yield {
+                    "cluster_id": row["cluster_id"],
+                    "email": row["email"],
+                    "match": row["match"],
+                    **prospect
+                }
+
+
+def iter_csv(rows, columns):
+    """Encode rows as CSV text chunks, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(["; ".join(value) if isinstance(value, list) else value
+                         for value in (row.get(column) for column in columns)])
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    """Encode rows as newline-delimited JSON chunks"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) == CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_export(rows, list_type, export_format):
+    """Encode an export list in the requested format"""
+    if export_format == "ndjson":
+        return iter_ndjson(rows)
+    return iter_csv(rows, EXPORT_COLUMNS[list_type])
@@ -1,11 +1,16 @@
 import requests
 from concurrent.futures import ThreadPoolExecutor
-from collections import defaultdict
-from datetime import datetime, timedelta
 from utils.auth_utils import get_credentials
+from utils.date_utils import now_epoch
+from .asset_catalog import sync_catalog
+from .activity_store import ActivityStore, form_activity_id
+from .funnel_engine import FormFunnel, snapshot_created_at
+from .Landing_page_service import LANDING_PAGE_FIELDS, fetch_all_activities as fetch_landing_page_activities
 import json
 import os
 
+FORM_FIELDS = "id,name,isDeleted,createdAt,updatedAt"
+ACTIVE_DAYS = 30  # Forms with activity in this many days are active
 
 
 def fetch_all_activities(headers, created_after=None, created_before=None):
@@ -51,10 +56,10 @@ def fetch_all_activities(headers, created_after=None, created_before=None):
     return all_activities
 
 
-def calculate_form_stats(form, activities_by_form):
+def calculate_form_stats(form, activity_store, active_ids):
     """Calculate statistics for a single form"""
     form_id = str(form["id"])
-    form_activities = activities_by_form.get(form_id, [])
+    form_activities = activity_store.activities(form_id)
     
     # Activity types: 2=View, 4=Success (Form Submission), 1,6=Clicks
     views = [a for a in form_activities if int(a.get("type", 0)) == 2]
@@ -71,12 +76,6 @@ def calculate_form_stats(form, activities_by_form):
     abandonment_rate = (abandoned / total_views * 100) if total_views > 0 else 0
     conversion_rate = (total_submissions / total_views * 100) if total_views > 0 else 0
     
-    # Check if form is active (has activity in last 30 days)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_activities = [a for a in form_activities if a.get("created_at") and 
-                        datetime.fromisoformat(a["created_at"].replace('Z', '+00:00')) > thirty_days_ago]
-    is_active = len(recent_activities) > 0
-    
     return {
         "id": form_id,
         "name": form["name"],
@@ -91,8 +90,8 @@ def calculate_form_stats(form, activities_by_form):
         "unique_clicks": get_unique_count(clicks),
         "conversions": len([a for a in submissions if a.get("prospect_id")]),
         "conversion_rate": round(conversion_rate, 2),
-        "is_active": is_active,
-        "last_activity": max([a.get("created_at") for a in form_activities], default=None) if form_activities else None
+        "is_active": form_id in active_ids,
+        "last_activity": activity_store.last_activity_at(form_id)
     }
 
 
@@ -107,54 +106,27 @@ def get_form_stats(access_token, created_after=None, created_before=None):
         
         print(f"Fetching forms and activities with headers: {headers}")
         
-        def fetch_all_forms():
-            all_forms = []
-            limit = 200
-            offset = 0
-            
-            while True:
-                response = requests.get(
-                    "https://pi.pardot.com/api/v5/objects/forms",
-                    headers=headers,
-                    params={"fields": "id,name,createdAt", "limit": limit, "offset": offset}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    forms = data.get("values", [])
-                    if forms:
-                        all_forms.extend(forms)
-                        offset += limit
-                    else:
-                        break
-                else:
-                    print(f"Error fetching forms: {response.status_code} - {response.text}")
-                    break
-            return all_forms
-        
+        # Form catalog is synced by updatedAt, so only changed forms are listed again
         with ThreadPoolExecutor(max_workers=2) as executor:
-            forms_future = executor.submit(fetch_all_forms)
+            catalog_future = executor.submit(sync_catalog, credentials['business_unit_id'], "forms", FORM_FIELDS, headers)
             activities_future = executor.submit(fetch_all_activities, headers, created_after, created_before)
             
-            forms = forms_future.result()
+            forms = catalog_future.result().values()
             activities = activities_future.result()
         
         print(f"Forms count: {len(forms) if forms else 0}")
         print(f"Activities count: {len(activities) if activities else 0}")
         print(f"Found {len(forms)} forms")
         
-        # Group activities by form_id
-        activities_by_form = defaultdict(list)
-        for activity in activities:
-            form_id = str(activity.get("form_id", "")) or str(activity.get("form", {}).get("id", ""))
-            if form_id:
-                activities_by_form[form_id].append(activity)
+        # Group activities by form, parsing each timestamp once
+        activity_store = ActivityStore(form_activity_id, activities)
+        active_ids = activity_store.active_ids(now_epoch() - ACTIVE_DAYS * 86400)
         
-        print(f"Activities grouped by {len(activities_by_form)} forms")
+        print(f"Activities grouped by {len(activity_store)} forms")
         
         # Calculate stats in parallel
         with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(calculate_form_stats, form, activities_by_form) for form in forms]
+            futures = [executor.submit(calculate_form_stats, form, activity_store, active_ids) for form in forms]
             form_stats = [future.result() for future in futures]
         
         # Filter out forms with no activities if date filters are applied
@@ -171,50 +143,6 @@ def get_form_stats(access_token, created_after=None, created_before=None):
         raise e
 
 
-
-
-def get_date_range_from_filter(filter_type):
-    """Convert filter type to date range"""
-    from datetime import datetime, timedelta
-    
-    now = datetime.now()
-    
-    if filter_type == "today":
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "yesterday":
-        yesterday = now - timedelta(days=1)
-        start = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-        end = yesterday.replace(hour=23, minute=59, second=59, microsecond=999999)
-    elif filter_type == "last_7_days":
-        start = now - timedelta(days=7)
-        end = now
-    elif filter_type == "last_30_days":
-        start = now - timedelta(days=30)
-        end = now
-    elif filter_type == "this_month":
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "last_month":
-        if now.month == 1:
-            start = now.replace(year=now.year-1, month=12, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-        else:
-            start = now.replace(month=now.month-1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-    elif filter_type == "this_quarter":
-        quarter_start_month = ((now.month - 1) // 3) * 3 + 1
-        start = now.replace(month=quarter_start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    elif filter_type == "this_year":
-        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now
-    else:
-        return None, None
-    
-    return start.isoformat(), end.isoformat()
-
-
 def get_form_abandonment_analysis(access_token, created_after=None, created_before=None):
     """Analyze form abandonment patterns and issues"""
     try:
@@ -302,4 +230,51 @@ def get_active_inactive_forms_from_cache(form_stats):
             "avg_conversion_rate_active": round(sum(f["conversion_rate"] for f in active_forms) / len(active_forms), 2) if active_forms else 0,
             "avg_conversion_rate_inactive": round(sum(f["conversion_rate"] for f in inactive_forms) / len(inactive_forms), 2) if inactive_forms else 0
         }
-    }
\ No newline at end of file
+    }
+
+
+def get_form_funnel_analysis(access_token, snapshot, lock, created_after=None, created_before=None):
+    """Per-visitor funnels from landing page views through form submissions to new prospects in the synced snapshot"""
+    try:
+        credentials = get_credentials()
+        business_unit_id = credentials['business_unit_id']
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Pardot-Business-Unit-Id": business_unit_id
+        }
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            forms_future = executor.submit(sync_catalog, business_unit_id, "forms", FORM_FIELDS, headers)
+            pages_future = executor.submit(sync_catalog, business_unit_id, "landing-pages", LANDING_PAGE_FIELDS, headers)
+            form_activities_future = executor.submit(fetch_all_activities, headers, created_after, created_before)
+            page_activities_future = executor.submit(fetch_landing_page_activities, headers, created_after, created_before)
+            
+            form_catalog = forms_future.result()
+            landing_page_forms = {str(page["id"]): str(page["formId"]) for page in pages_future.result().values() if page.get("formId")}
+            funnel = FormFunnel(landing_page_forms, form_activities_future.result())
+            funnel.ingest(page_activities_future.result())
+        
+        with lock:
+            funnels = funnel.summarize(snapshot_created_at(snapshot))
+        for form_funnel in funnels:
+            form = form_catalog.get(form_funnel["form_id"])
+            form_funnel["name"] = form["name"] if form else "Unknown"
+        funnels.sort(key=lambda f: f["visitors"], reverse=True)
+        
+        visitors = sum(f["visitors"] for f in funnels)
+        submitters = sum(f["submitters"] for f in funnels)
+        return {
+            "summary": {
+                "total_forms": len(funnels),
+                "total_visitors": visitors,
+                "total_submitters": submitters,
+                "total_abandoned": visitors - submitters,
+                "total_new_prospects": sum(f["new_prospects"] for f in funnels),
+                "overall_abandonment_rate": round((visitors - submitters) / visitors * 100, 2) if visitors else 0,
+                "landing_pages_with_forms": len(landing_page_forms)
+            },
+            "funnels": funnels
+        }
+    except Exception as e:
+        print(f"Error in get_form_funnel_analysis: {str(e)}")
+        raise e
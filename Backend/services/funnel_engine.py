@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_right
+from utils.date_utils import parse_timestamp
+from .prospect_snapshot import NO_DATE, BAD_DATE
+
+# Funnel stages, in order
+LANDING_PAGE_VIEW = 0
+FORM_VIEW = 1
+SUBMISSION = 2
+
+# v4 visitor activity types
+VIEW_TYPE = 2
+SUCCESS_TYPE = 4
+
+# Time from first view to submission: upper bound in seconds -> label; the last bucket is open ended
+TIME_TO_CONVERT_BUCKETS = [
+    (60, "Under 1 minute"),
+    (3600, "1-60 minutes"),
+    (86400, "1-24 hours"),
+    (7 * 86400, "1-7 days"),
+    (None, "7+ days"),
+]
+_BUCKET_BOUNDS = [bound for bound, _ in TIME_TO_CONVERT_BUCKETS[:-1]]
+
+
+def snapshot_created_at(snapshot):
+    """Prospect id -> createdAt epoch lookup over a prospect snapshot"""
+    def created_at(prospect_id):
+        try:
+            position = snapshot.position(int(prospect_id))
+        except (ValueError, TypeError):
+            return None
+        if position is None:
+            return None
+        epoch = snapshot.created_at[position]
+        return None if epoch in (NO_DATE, BAD_DATE) else epoch
+    return created_at
+
+
+def _median(values):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) // 2
+
+
+class FormFunnel:
+    """Per-visitor form funnels: landing page view -> form view -> submission -> new prospect.
+
+    Landing page activity is attributed to the page's form through its
+    formId. Activities are folded in one pass into each (form, visitor)
+    journey's first time at every stage, so funnels are summarized from the
+    journeys without rescanning activities per form.
+    """
+
+    def __init__(self, landing_page_forms, activities=()):
+        self.landing_page_forms = landing_page_forms  # landing page id (str) -> form id (str)
+        self.journeys = {}  # (form id, visitor) -> [first landing page view, first form view, first submission, prospect id]
+        self.ingest(activities)
+
+    def _stage(self, activity):
+        """(form id, stage) for a funnel activity, or None"""
+        try:
+            activity_type = int(activity.get("type", 0))
+        except (ValueError, TypeError):
+            return None
+        if activity_type not in (VIEW_TYPE, SUCCESS_TYPE):
+            return None
+
+        form_id = activity.get("form_id") or (activity.get("form") or {}).get("id")
+        if form_id:
+            return str(form_id), FORM_VIEW if activity_type == VIEW_TYPE else SUBMISSION
+
+        page_id = activity.get("landing_page_id") or (activity.get("landing_page") or {}).get("id")
+        form_id = self.landing_page_forms.get(str(page_id)) if page_id else None
+        if form_id:
+            return form_id, LANDING_PAGE_VIEW if activity_type == VIEW_TYPE else SUBMISSION
+        return None
+
+    def ingest(self, activities):
+        """Fold visitor activities into the journeys"""
+        journeys = self.journeys
+        for activity in activities:
+            visitor = activity.get("visitor_id") or activity.get("prospect_id")
+            if not visitor:
+                continue
+            stage = self._stage(activity)
+            if stage is None:
+                continue
+            epoch = parse_timestamp(activity.get("created_at"))
+            if epoch is None:
+                continue
+
+            form_id, index = stage
+            key = (form_id, str(visitor))
+            journey = journeys.get(key)
+            if journey is None:
+                journey = journeys[key] = [None, None, None, None]
+            if journey[index] is None or epoch < journey[index]:
+                journey[index] = epoch
+            if activity.get("prospect_id"):
+                journey[3] = activity.get("prospect_id")
+
+    def summarize(self, prospect_created_at=None):
+        """Funnel counts, per-visitor abandonment and time-to-convert per form.
+
+        A submitter counts as a new prospect when prospect_created_at (prospect
+        id -> createdAt epoch) places the prospect's creation at or after the
+        visitor's first touch of the funnel.
+        """
+        forms = {}
+        durations = {}
+        for (form_id, _), (page_view, form_view, submitted, prospect_id) in self.journeys.items():
+            funnel = forms.get(form_id)
+            if funnel is None:
+                funnel = forms[form_id] = {
+                    "form_id": form_id,
+                    "visitors": 0,
+                    "landing_page_visitors": 0,
+                    "form_visitors": 0,
+                    "submitters": 0,
+                    "abandoned_visitors": 0,
+                    "new_prospects": 0,
+                    "time_to_convert": [0] * len(TIME_TO_CONVERT_BUCKETS)
+                }
+                durations[form_id] = array('q')
+
+            funnel["visitors"] += 1
+            if page_view is not None:
+                funnel["landing_page_visitors"] += 1
+            if form_view is not None:
+                funnel["form_visitors"] += 1
+            if submitted is None:
+                funnel["abandoned_visitors"] += 1
+                continue
+
+            funnel["submitters"] += 1
+            first_view = min(epoch for epoch in (page_view, form_view, submitted) if epoch is not None)
+            duration = submitted - first_view
+            funnel["time_to_convert"][bisect_right(_BUCKET_BOUNDS, duration)] += 1
+            durations[form_id].append(duration)
+
+            if prospect_id and prospect_created_at is not None:
+                created = prospect_created_at(prospect_id)
+                if created is not None and created >= first_view:
+                    funnel["new_prospects"] += 1
+
+        results = []
+        for form_id, funnel in forms.items():
+            visitors = funnel["visitors"]
+            funnel["abandonment_rate"] = round(funnel["abandoned_visitors"] / visitors * 100, 2) if visitors else 0
+            funnel["conversion_rate"] = round(funnel["submitters"] / visitors * 100, 2) if visitors else 0
+            funnel["prospect_conversion_rate"] = round(funnel["new_prospects"] / visitors * 100, 2) if visitors else 0
+            funnel["median_seconds_to_convert"] = _median(durations[form_id])
+            funnel["time_to_convert"] = {label: count for (_, label), count in zip(TIME_TO_CONVERT_BUCKETS, funnel["time_to_convert"])}
+            results.append(funnel)
+        return results
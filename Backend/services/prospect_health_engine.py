@@ -0,0 +1,365 @@
+import time
+from bisect import bisect_left, insort
+from .dedupe_service import email_key, normalize_email
+from .prospect_snapshot import NO_DATE, BAD_DATE
+
+DAY = 86400
+
+# Health rules
+INACTIVE_DAYS = 90
+INACTIVITY_BUCKETS = [(365, "365+ days"), (180, "180-365 days"), (90, "90-180 days")]
+CRITICAL_FIELDS = ["country", "jobTitle", "firstName", "lastName"]
+HIGH_SCORE_NO_ACTIVITY = 50
+HIGH_SCORE_STALE = 75
+HIGH_SCORE_STALE_DAYS = 30
+
+# Threshold query parameters and their defaults; min_score=None means any score
+HEALTH_THRESHOLDS = {
+    "inactive_days": INACTIVE_DAYS,
+    "min_score": None,
+    "no_activity_score": HIGH_SCORE_NO_ACTIVITY,
+    "stale_score": HIGH_SCORE_STALE,
+    "stale_days": HIGH_SCORE_STALE_DAYS,
+}
+
+# Width of the score ranges the activity index is split into
+SCORE_BUCKET_SIZE = 10
+
+
+def _missing_mask(snapshot, i):
+    """Bitmask of CRITICAL_FIELDS missing on row i (bit order follows the list)"""
+    mask = 0
+    if not snapshot.countries[i]:
+        mask |= 1
+    if not snapshot.job_titles[i]:
+        mask |= 2
+    if not snapshot.first_names[i]:
+        mask |= 4
+    if not snapshot.last_names[i]:
+        mask |= 8
+    return mask
+
+
+def mask_to_fields(mask):
+    """Expand a missing-field bitmask into field names"""
+    return [field for bit, field in enumerate(CRITICAL_FIELDS) if mask & (1 << bit)]
+
+
+class HealthIndex:
+    """Prospect health aggregates maintained under insert, update and delete deltas.
+
+    Building walks the snapshot once; afterwards apply() adjusts the
+    aggregates for changed rows only. Time-dependent metrics are answered from
+    indexes ordered by lastActivityAt: one over every prospect and one per
+    SCORE_BUCKET_SIZE score range. Any inactivity window or score threshold is
+    then a few bisects rather than a scan, so thresholds can be query
+    parameters.
+    """
+
+    def __init__(self, snapshot):
+        self.total = 0
+        self.entries = {}  # prospect id -> (email key, activity, missing mask, score, grade)
+        self.email_groups = {}
+        self.duplicate_keys = set()
+        self.never_active = set()
+        self.bad_activity = set()
+        self.activity_index = []  # sorted (lastActivityAt epoch, prospect id)
+        self.missing = {}  # prospect id -> missing-field bitmask
+        self.field_counts = {field: 0 for field in CRITICAL_FIELDS}
+        self.score_buckets = {}  # score // SCORE_BUCKET_SIZE -> {"activity": sorted (epoch, id), "never": ids, "unknown": ids}
+        self.grade_counts = {}
+
+        # Append during the build and sort once instead of inserting row by row
+        for position in range(len(snapshot)):
+            self._add(snapshot, position, bulk=True)
+        self.activity_index.sort()
+        for bucket in self.score_buckets.values():
+            bucket["activity"].sort()
+
+    def apply(self, snapshot, upserted, deleted):
+        """Update aggregates for changed and deleted prospect ids"""
+        for prospect_id in deleted:
+            self._discard(prospect_id)
+        for prospect_id in upserted:
+            self._discard(prospect_id)
+            position = snapshot.position(prospect_id)
+            if position is not None:
+                self._add(snapshot, position)
+
+    def _add(self, snapshot, position, bulk=False):
+        prospect_id = snapshot.ids[position]
+        key = email_key(snapshot.emails[position])
+        activity = snapshot.last_activity[position]
+        mask = _missing_mask(snapshot, position)
+        score = snapshot.scores[position]
+        grade = snapshot.grade(position)
+
+        self.entries[prospect_id] = (key, activity, mask, score, grade)
+        self.total += 1
+
+        if key is not None:
+            group = self.email_groups.setdefault(key, [])
+            group.append(prospect_id)
+            if len(group) == 2:
+                self.duplicate_keys.add(key)
+
+        bucket = self.score_buckets.get(score // SCORE_BUCKET_SIZE)
+        if bucket is None:
+            bucket = self.score_buckets[score // SCORE_BUCKET_SIZE] = {"activity": [], "never": set(), "unknown": set()}
+
+        if activity == NO_DATE:
+            self.never_active.add(prospect_id)
+            bucket["never"].add(prospect_id)
+        elif activity == BAD_DATE:
+            self.bad_activity.add(prospect_id)
+            bucket["unknown"].add(prospect_id)
+        elif bulk:
+            self.activity_index.append((activity, prospect_id))
+            bucket["activity"].append((activity, prospect_id))
+        else:
+            insort(self.activity_index, (activity, prospect_id))
+            insort(bucket["activity"], (activity, prospect_id))
+
+        if mask:
+            self.missing[prospect_id] = mask
+            for bit, field in enumerate(CRITICAL_FIELDS):
+                if mask & (1 << bit):
+                    self.field_counts[field] += 1
+
+        if grade:
+            self.grade_counts[grade] = self.grade_counts.get(grade, 0) + 1
+
+    def _discard(self, prospect_id):
+        entry = self.entries.pop(prospect_id, None)
+        if entry is None:
+            return
+        key, activity, mask, score, grade = entry
+        self.total -= 1
+
+        if key is not None:
+            group = self.email_groups[key]
+            group.remove(prospect_id)
+            if len(group) == 1:
+                self.duplicate_keys.discard(key)
+            elif not group:
+                del self.email_groups[key]
+
+        bucket = self.score_buckets[score // SCORE_BUCKET_SIZE]
+        if activity == NO_DATE:
+            self.never_active.discard(prospect_id)
+            bucket["never"].discard(prospect_id)
+        elif activity == BAD_DATE:
+            self.bad_activity.discard(prospect_id)
+            bucket["unknown"].discard(prospect_id)
+        else:
+            _sorted_remove(self.activity_index, (activity, prospect_id))
+            _sorted_remove(bucket["activity"], (activity, prospect_id))
+        if not (bucket["activity"] or bucket["never"] or bucket["unknown"]):
+            del self.score_buckets[score // SCORE_BUCKET_SIZE]
+
+        if mask:
+            del self.missing[prospect_id]
+            for bit, field in enumerate(CRITICAL_FIELDS):
+                if mask & (1 << bit):
+                    self.field_counts[field] -= 1
+
+        if grade:
+            self.grade_counts[grade] -= 1
+            if not self.grade_counts[grade]:
+                del self.grade_counts[grade]
+
+    def _scored(self, kind, min_score, cutoff=None, count=False):
+        """Ids (or their count) scoring above min_score that are never active,
+        unknown, or ("stale") last active before cutoff"""
+        result = 0 if count else []
+        for key, bucket in self.score_buckets.items():
+            if (key + 1) * SCORE_BUCKET_SIZE - 1 <= min_score:
+                continue
+            if kind == "stale":
+                rows = bucket["activity"][:bisect_left(bucket["activity"], (cutoff,))]
+                ids = [prospect_id for _, prospect_id in rows]
+            else:
+                ids = bucket[kind]
+            # Only the bucket straddling min_score needs a per-row check
+            if key * SCORE_BUCKET_SIZE <= min_score:
+                ids = [prospect_id for prospect_id in ids if self.entries[prospect_id][3] > min_score]
+            if count:
+                result += len(ids)
+            else:
+                result.extend(ids)
+        return result
+
+    def _stale_scored(self, min_score, cutoff):
+        """Stale ids scoring above min_score, oldest activity first"""
+        ids = self._scored("stale", min_score, cutoff)
+        ids.sort(key=lambda prospect_id: self.entries[prospect_id][1])
+        return ids
+
+    def inactive_ids(self, now=None, days=INACTIVE_DAYS, min_score=None):
+        """Never-active, unparseable and stale prospect ids, oldest activity first.
+
+        With min_score only prospects scoring above it are returned.
+        """
+        now = int(now if now is not None else time.time())
+        cutoff = now - days * DAY
+        if min_score is None:
+            stale = bisect_left(self.activity_index, (cutoff,))
+            return (list(self.never_active) + list(self.bad_activity) +
+                    [prospect_id for _, prospect_id in self.activity_index[:stale]])
+        return (self._scored("never", min_score) + self._scored("unknown", min_score) +
+                self._stale_scored(min_score, cutoff))
+
+    def inactive_count(self, now=None, days=INACTIVE_DAYS, min_score=None):
+        """Number of ids inactive_ids() would return"""
+        now = int(now if now is not None else time.time())
+        cutoff = now - days * DAY
+        if min_score is None:
+            return len(self.never_active) + len(self.bad_activity) + bisect_left(self.activity_index, (cutoff,))
+        return (self._scored("never", min_score, count=True) + self._scored("unknown", min_score, count=True) +
+                self._scored("stale", min_score, cutoff, count=True))
+
+    def scoring_issue_ids(self, now=None, no_activity_score=HIGH_SCORE_NO_ACTIVITY,
+                          stale_score=HIGH_SCORE_STALE, stale_days=HIGH_SCORE_STALE_DAYS):
+        """Prospect ids whose high score is not backed by recent activity"""
+        now = int(now if now is not None else time.time())
+        return self._scored("never", no_activity_score) + self._stale_scored(stale_score, now - stale_days * DAY)
+
+    def scoring_issue_count(self, now=None, no_activity_score=HIGH_SCORE_NO_ACTIVITY,
+                            stale_score=HIGH_SCORE_STALE, stale_days=HIGH_SCORE_STALE_DAYS):
+        """Number of ids scoring_issue_ids() would return"""
+        now = int(now if now is not None else time.time())
+        return (self._scored("never", no_activity_score, count=True) +
+                self._scored("stale", stale_score, now - stale_days * DAY, count=True))
+
+    def duplicate_clusters(self, snapshot):
+        """Compact duplicate clusters for every email key shared by several prospects.
+
+        Clusters are ordered by email and identified by their email key, so
+        pages and cluster ids stay put between requests.
+        """
+        clusters = []
+        for key in self.duplicate_keys:
+            prospect_ids = self.email_groups[key]
+            clusters.append({
+                "cluster_id": key.hex(),
+                "email": normalize_email(snapshot.emails[snapshot.position(prospect_ids[0])]),
+                "match": "email",
+                "count": len(prospect_ids),
+                "prospect_ids": list(prospect_ids)
+            })
+        clusters.sort(key=lambda cluster: (cluster["email"], cluster["cluster_id"]))
+        return clusters
+
+    def summary(self, now=None, inactive_days=INACTIVE_DAYS, min_score=None, no_activity_score=HIGH_SCORE_NO_ACTIVITY,
+                stale_score=HIGH_SCORE_STALE, stale_days=HIGH_SCORE_STALE_DAYS):
+        """Health counts for the given thresholds, computed without scanning the prospect table"""
+        now = int(now if now is not None else time.time())
+
+        inactivity_buckets = {}
+        # Buckets are disjoint: count entries between consecutive cutoffs
+        cutoffs = [bisect_left(self.activity_index, (now - threshold * DAY,)) for threshold, _ in INACTIVITY_BUCKETS]
+        previous = 0
+        for (_, label), cutoff in zip(INACTIVITY_BUCKETS, cutoffs):
+            inactivity_buckets[label] = cutoff - previous
+            previous = cutoff
+        inactivity_buckets["never"] = len(self.never_active)
+        inactivity_buckets["unknown"] = len(self.bad_activity)
+
+        total_graded = sum(self.grade_counts.values())
+
+        return {
+            "total_prospects": self.total,
+            "duplicates": {
+                "count": len(self.duplicate_keys)
+            },
+            "inactive": {
+                "count": self.inactive_count(now, inactive_days, min_score),
+                "buckets": inactivity_buckets
+            },
+            "missing_fields": {
+                "count": len(self.missing),
+                "field_counts": dict(self.field_counts)
+            },
+            "scoring_issues": {
+                "count": self.scoring_issue_count(now, no_activity_score, stale_score, stale_days)
+            },
+            "grading": {
+                "total_prospects": self.total,
+                "graded_prospects": total_graded,
+                "ungraded_prospects": self.total - total_graded,
+                "grading_coverage": round((total_graded / self.total) * 100, 2) if self.total else 0,
+                "grade_distribution": dict(self.grade_counts),
+                "grade_percentages": {
+                    grade: round((count / total_graded) * 100, 2) for grade, count in self.grade_counts.items()
+                } if total_graded else {}
+            }
+        }
+
+
+def _sorted_remove(index, item):
+    """Remove one item from a sorted list"""
+    position = bisect_left(index, item)
+    if position < len(index) and index[position] == item:
+        del index[position]
+
+
+def render_inactive(snapshot, prospect_ids, now=None):
+    """Build inactive prospect detail rows for the given ids"""
+    now = int(now if now is not None else time.time())
+    rows = []
+    for prospect_id in prospect_ids:
+        i = snapshot.position(prospect_id)
+        activity = snapshot.last_activity[i]
+        if activity == NO_DATE:
+            days = "Never"
+        elif activity == BAD_DATE:
+            days = "Unknown"
+        else:
+            days = (now - activity) // DAY
+        rows.append({
+            "id": prospect_id,
+            "email": snapshot.emails[i],
+            "firstName": snapshot.first_names[i],
+            "lastName": snapshot.last_names[i],
+            "lastActivityAt": snapshot.format_date('last_activity', i),
+            "daysSinceActivity": days
+        })
+    return rows
+
+
+def render_missing_fields(snapshot, prospect_ids, masks):
+    """Build missing-field detail rows for the given ids and bitmasks"""
+    rows = []
+    for prospect_id, mask in zip(prospect_ids, masks):
+        i = snapshot.position(prospect_id)
+        rows.append({
+            "id": prospect_id,
+            "email": snapshot.emails[i],
+            "firstName": snapshot.first_names[i],
+            "lastName": snapshot.last_names[i],
+            "missingFields": mask_to_fields(mask)
+        })
+    return rows
+
+
+def render_scoring_issues(snapshot, prospect_ids, now=None):
+    """Build scoring inconsistency detail rows for the given ids"""
+    now = int(now if now is not None else time.time())
+    rows = []
+    for prospect_id in prospect_ids:
+        i = snapshot.position(prospect_id)
+        activity = snapshot.last_activity[i]
+        if activity == NO_DATE:
+            issue = "High score but no activity recorded"
+        else:
+            issue = f"High score but no activity in {(now - activity) // DAY} days"
+        rows.append({
+            "id": prospect_id,
+            "email": snapshot.emails[i],
+            "firstName": snapshot.first_names[i],
+            "lastName": snapshot.last_names[i],
+            "score": snapshot.scores[i],
+            "issue": issue,
+            "lastActivityAt": snapshot.format_date('last_activity', i)
+        })
+    return rows
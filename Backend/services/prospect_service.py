@@ -1,231 +1,92 @@
-import requests
-from datetime import datetime, timedelta
 from utils.auth_utils import get_credentials
-from .prospect_filter_service import filter_prospects
+from .dedupe_service import find_duplicate_clusters, expand_duplicate_clusters
+from .prospect_store import get_prospect_store, sync_prospects
+from .prospect_health_engine import HealthIndex, HEALTH_THRESHOLDS, render_inactive, render_missing_fields, render_scoring_issues
 
-def fetch_all_prospects(headers):
-    """Fetch all prospects with pagination"""
-    all_prospects = []
-    url = "https://pi.pardot.com/api/v5/objects/prospects"
-    params = {
-        "fields": "id,email,firstName,lastName,country,jobTitle,score,grade,lastActivityAt,createdAt",
-        "limit": 1000
-    }
-    
-    while url:
-        print(f"Fetching prospects from: {url}")
-        response = requests.get(url, headers=headers, params=params if url.endswith("prospects") else None)
-        
-        if response.status_code != 200:
-            print(f"Error fetching prospects: {response.status_code} - {response.text}")
-            break
-            
-        data = response.json()
-        prospects = data.get("values", [])
-        all_prospects.extend(prospects)
-        
-        url = data.get("nextPageUrl")
-        params = None  # Clear params for subsequent requests
-        
-        # Limit to prevent timeout (remove this in production)
-        if len(all_prospects) >= 10000:
-            break
-    
-    return all_prospects
-
-def find_duplicate_prospects(prospects):
-    """Find prospects with duplicate email addresses"""
-    email_groups = {}
-    
-    for prospect in prospects:
-        email = prospect.get('email', '').lower().strip()
-        if email:
-            if email not in email_groups:
-                email_groups[email] = []
-            email_groups[email].append(prospect)
-    
-    duplicates = []
-    for email, group in email_groups.items():
-        if len(group) > 1:
-            duplicates.append({
-                "email": email,
-                "count": len(group),
-                "prospects": [{
-                    "id": p.get('id'),
-                    "firstName": p.get('firstName', ''),
-                    "lastName": p.get('lastName', ''),
-                    "createdAt": p.get('createdAt', '')
-                } for p in group]
-            })
-    
-    return duplicates
-
-def find_inactive_prospects(prospects):
-    """Find prospects with no activity in 90+ days"""
-    cutoff_date = datetime.now() - timedelta(days=90)
-    inactive = []
-    
-    for prospect in prospects:
-        last_activity = prospect.get('lastActivityAt')
-        if not last_activity:
-            # No activity recorded
-            inactive.append({
-                "id": prospect.get('id'),
-                "email": prospect.get('email', ''),
-                "firstName": prospect.get('firstName', ''),
-                "lastName": prospect.get('lastName', ''),
-                "lastActivityAt": None,
-                "daysSinceActivity": "Never"
-            })
-        else:
-            try:
-                # Parse the date string
-                activity_date = datetime.fromisoformat(last_activity.replace('Z', '+00:00'))
-                if activity_date < cutoff_date:
-                    days_inactive = (datetime.now() - activity_date.replace(tzinfo=None)).days
-                    inactive.append({
-                        "id": prospect.get('id'),
-                        "email": prospect.get('email', ''),
-                        "firstName": prospect.get('firstName', ''),
-                        "lastName": prospect.get('lastName', ''),
-                        "lastActivityAt": last_activity,
-                        "daysSinceActivity": days_inactive
-                    })
-            except:
-                # If date parsing fails, consider as inactive
-                inactive.append({
-                    "id": prospect.get('id'),
-                    "email": prospect.get('email', ''),
-                    "firstName": prospect.get('firstName', ''),
-                    "lastName": prospect.get('lastName', ''),
-                    "lastActivityAt": last_activity,
-                    "daysSinceActivity": "Unknown"
-                })
-    
-    return inactive
+# Paging for health detail lists
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-def find_missing_critical_fields(prospects):
-    """Find prospects missing critical fields"""
-    missing = []
-    
-    for prospect in prospects:
-        missing_fields = []
-        
-        if not prospect.get('country'):
-            missing_fields.append('country')
-        if not prospect.get('jobTitle'):
-            missing_fields.append('jobTitle')
-        if not prospect.get('firstName'):
-            missing_fields.append('firstName')
-        if not prospect.get('lastName'):
-            missing_fields.append('lastName')
-        
-        if missing_fields:
-            missing.append({
-                "id": prospect.get('id'),
-                "email": prospect.get('email', ''),
-                "firstName": prospect.get('firstName', ''),
-                "lastName": prospect.get('lastName', ''),
-                "missingFields": missing_fields
-            })
-    
-    return missing
-
-def find_scoring_inconsistencies(prospects):
-    """Find prospects with scoring inconsistencies"""
-    inconsistencies = []
-    
-    for prospect in prospects:
-        score = prospect.get('score', 0)
-        last_activity = prospect.get('lastActivityAt')
-        
-        # High score but no recent activity (potential issue)
-        if score > 50 and not last_activity:
-            inconsistencies.append({
-                "id": prospect.get('id'),
-                "email": prospect.get('email', ''),
-                "firstName": prospect.get('firstName', ''),
-                "lastName": prospect.get('lastName', ''),
-                "score": score,
-                "issue": "High score but no activity recorded",
-                "lastActivityAt": last_activity
-            })
-        elif score > 75:
-            # Check if high score aligns with recent activity
-            try:
-                if last_activity:
-                    activity_date = datetime.fromisoformat(last_activity.replace('Z', '+00:00'))
-                    days_since = (datetime.now() - activity_date.replace(tzinfo=None)).days
-                    
-                    if days_since > 30:
-                        inconsistencies.append({
-                            "id": prospect.get('id'),
-                            "email": prospect.get('email', ''),
-                            "firstName": prospect.get('firstName', ''),
-                            "lastName": prospect.get('lastName', ''),
-                            "score": score,
-                            "issue": f"High score but no activity in {days_since} days",
-                            "lastActivityAt": last_activity
-                        })
-            except:
-                pass
-    
-    return inconsistencies
-
-def analyze_grading_setup(prospects):
-    """Analyze grading distribution and setup"""
-    grade_distribution = {}
-    total_graded = 0
-    
-    for prospect in prospects:
-        grade = prospect.get('grade')
-        if grade:
-            total_graded += 1
-            if grade not in grade_distribution:
-                grade_distribution[grade] = 0
-            grade_distribution[grade] += 1
-    
-    # Calculate percentages
-    grade_percentages = {}
-    if total_graded > 0:
-        for grade, count in grade_distribution.items():
-            grade_percentages[grade] = round((count / total_graded) * 100, 2)
-    
-    return {
-        "total_prospects": len(prospects),
-        "graded_prospects": total_graded,
-        "ungraded_prospects": len(prospects) - total_graded,
-        "grading_coverage": round((total_graded / len(prospects)) * 100, 2) if prospects else 0,
-        "grade_distribution": grade_distribution,
-        "grade_percentages": grade_percentages
-    }
+def find_duplicate_prospects(prospects, fuzzy=False):
+    """Find duplicate prospects as compact clusters of prospect ids"""
+    return find_duplicate_clusters(prospects, fuzzy=fuzzy)
 
-def analyze_prospect_health(prospects, headers):
-    """Analyze prospect database health"""
-    # Initialize counters
-    duplicates = find_duplicate_prospects(prospects)
-    inactive_prospects = find_inactive_prospects(prospects)
-    missing_fields = find_missing_critical_fields(prospects)
-    
+def summarize_health(health_index, thresholds=None):
+    """Slim health payload with summary counts only"""
+    thresholds = dict(HEALTH_THRESHOLDS, **(thresholds or {}))
+    health = health_index.summary(**thresholds)
     return {
-        "total_prospects": len(prospects),
+        "total_prospects": health["total_prospects"],
         "duplicates": {
-            "count": len(duplicates),
-            "details": duplicates
+            "count": health["duplicates"]["count"]
         },
         "inactive_prospects": {
-            "count": len(inactive_prospects),
-            "details": inactive_prospects
+            "count": health["inactive"]["count"],
+            "buckets": health["inactive"]["buckets"]
         },
         "missing_fields": {
-            "count": len(missing_fields),
-            "details": missing_fields
+            "count": health["missing_fields"]["count"],
+            "field_counts": health["missing_fields"]["field_counts"]
         },
-        "all_prospects": prospects  # Cache all prospects for filtering
+        "scoring_issues": {
+            "count": health["scoring_issues"]["count"]
+        },
+        "grading_analysis": health["grading"],
+        "thresholds": thresholds
     }
 
-def get_prospect_health(access_token):
-    """Main function to get prospect health analysis"""
+def paginate(items, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """Slice a list into a page, returning the slice and paging metadata"""
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    total = len(items)
+    total_pages = max(1, -(-total // page_size))
+    page = max(1, min(int(page), total_pages))
+    start = (page - 1) * page_size
+    
+    return items[start:start + page_size], {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": total_pages
+    }
+
+def get_health_detail_items(snapshot, health_index, detail_type, thresholds=None):
+    """Ordered ids (compact clusters for duplicates) making up a health detail list"""
+    thresholds = dict(HEALTH_THRESHOLDS, **(thresholds or {}))
+    if detail_type == "duplicates":
+        return health_index.duplicate_clusters(snapshot)
+    if detail_type == "inactive":
+        return health_index.inactive_ids(days=thresholds["inactive_days"], min_score=thresholds["min_score"])
+    if detail_type == "missing_fields":
+        return list(health_index.missing)
+    if detail_type == "scoring_issues":
+        return health_index.scoring_issue_ids(no_activity_score=thresholds["no_activity_score"],
+                                              stale_score=thresholds["stale_score"],
+                                              stale_days=thresholds["stale_days"])
+    raise ValueError(f"Unknown detail type: {detail_type}")
+
+def render_health_detail(snapshot, health_index, detail_type, items):
+    """Render detail rows for a slice of get_health_detail_items()"""
+    if detail_type == "duplicates":
+        ids = [prospect_id for cluster in items for prospect_id in cluster["prospect_ids"]]
+        return expand_duplicate_clusters(items, snapshot.records(ids))
+    if detail_type == "inactive":
+        return render_inactive(snapshot, items)
+    if detail_type == "missing_fields":
+        return render_missing_fields(snapshot, items, [health_index.missing.get(i, 0) for i in items])
+    return render_scoring_issues(snapshot, items)
+
+def get_health_detail_page(snapshot, health_index, detail_type, page=1, page_size=DEFAULT_PAGE_SIZE, thresholds=None):
+    """Render one page of a health detail list from the server-side snapshot"""
+    items, meta = paginate(get_health_detail_items(snapshot, health_index, detail_type, thresholds), page, page_size)
+    return render_health_detail(snapshot, health_index, detail_type, items), meta
+
+def build_prospect_health(access_token, full_sync=False):
+    """Sync the local prospect store and return its snapshot together with health results.
+
+    Later syncs change both in place, so callers read them while holding the
+    store lock.
+    """
     try:
         credentials = get_credentials()
         headers = {
@@ -233,35 +94,21 @@ def get_prospect_health(access_token):
             "Pardot-Business-Unit-Id": credentials['business_unit_id']
         }
         
-        prospects = fetch_all_prospects(headers)
-        health_data = analyze_prospect_health(prospects, headers)
-        
-        return health_data
+        store = get_prospect_store(credentials['business_unit_id'])
+        with store.lock:
+            changes = sync_prospects(store, headers, full=full_sync)
+            if store.health is None:
+                store.health = HealthIndex(store.snapshot)
+            else:
+                store.health.apply(store.snapshot, changes["upserted"], changes["deleted"])
+            return store.snapshot, store.health
     except Exception as e:
-        print(f"Error in get_prospect_health: {str(e)}")
+        print(f"Error in build_prospect_health: {str(e)}")
         raise e
 
-def get_filtered_prospects(access_token, filters):
-    """Get filtered prospects based on provided filters"""
-    try:
-        credentials = get_credentials()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": credentials['business_unit_id']
-        }
-        
-        # Get all prospects (this could be cached for better performance)
-        prospects = fetch_all_prospects(headers)
-        
-        # Apply filters
-        filtered_prospects = filter_prospects(prospects, filters)
-        
-        return {
-            "total_prospects": len(prospects),
-            "filtered_count": len(filtered_prospects),
-            "prospects": filtered_prospects,
-            "filters_applied": filters
-        }
-    except Exception as e:
-        print(f"Error in get_filtered_prospects: {str(e)}")
-        raise e
\ No newline at end of file
+def get_prospect_health(access_token):
+    """Main function to get prospect health analysis"""
+    store = get_prospect_store(get_credentials()['business_unit_id'])
+    with store.lock:
+        _, health = build_prospect_health(access_token)
+        return summarize_health(health)
@@ -0,0 +1,261 @@
+import sys
+from array import array
+from utils.date_utils import parse_timestamp, format_iso
+
+# Sentinels stored in epoch columns
+NO_DATE = -1
+BAD_DATE = -2
+
+
+def _to_epoch(value):
+    """Convert a Pardot timestamp to epoch seconds"""
+    if not value:
+        return NO_DATE
+    epoch = parse_timestamp(value)
+    return BAD_DATE if epoch is None else epoch
+
+
+def _to_score(value):
+    """Coerce a Pardot score to an integer"""
+    try:
+        return int(float(value or 0))
+    except (ValueError, TypeError):
+        return 0
+
+
+def _to_text(value):
+    """Interned string so repeated values (countries, titles, companies) share one object"""
+    if not value:
+        return ''
+    return sys.intern(value if isinstance(value, str) else str(value))
+
+
+# Column attribute -> (record field, kind), in the order fields are serialized
+COLUMNS = {
+    'emails': ('email', 'text'),
+    'first_names': ('firstName', 'text'),
+    'last_names': ('lastName', 'text'),
+    'companies': ('company', 'text'),
+    'countries': ('country', 'text'),
+    'job_titles': ('jobTitle', 'text'),
+    'scores': ('score', 'score'),
+    'grade_codes': ('grade', 'grade'),
+    'last_activity': ('lastActivityAt', 'date'),
+    'created_at': ('createdAt', 'date'),
+    'updated_at': ('updatedAt', 'date'),
+    'utm_campaigns': ('utm_campaign__c', 'text'),
+    'utm_mediums': ('utm_medium__c', 'text'),
+    'utm_sources': ('utm_source__c', 'text'),
+    'utm_terms': ('utm_term__c', 'text'),
+}
+
+# Record field -> column attribute
+FIELD_COLUMNS = {field: name for name, (field, _) in COLUMNS.items()}
+
+# Storage per column kind: strings in lists, numbers in typed arrays
+STORAGE = {
+    'text': list,
+    'score': lambda: array('l'),
+    'grade': lambda: array('H'),
+    'date': lambda: array('q'),
+}
+
+
+class ProspectSnapshot:
+    """Prospects stored as typed columns (struct of arrays) instead of raw JSON dicts.
+
+    Strings are interned, grades are small integer codes into a per-snapshot
+    vocabulary and timestamps are epoch seconds. to_dict() and records()
+    render rows back into the shape the API returned. Tags are not part of
+    the prospect record; they are synced separately through set_tags().
+    """
+
+    def __init__(self, prospects=()):
+        self.ids = array('q')
+        for name, (_, kind) in COLUMNS.items():
+            setattr(self, name, STORAGE[kind]())
+        self.grade_labels = ['']  # grade code -> grade; 0 means ungraded
+        self._grade_codes = {'': 0}
+        self.unparsed_dates = {}  # (column, prospect id) -> raw value that failed to parse
+        self._positions = {}
+        self.version = 0  # Bumped on every change so derived indexes know to rebuild
+        self.tags = []  # position -> tuple of interned tag names
+        self.tags_synced = False  # True once tag assignments have been loaded
+        self.tags_version = 0  # Bumped only when the tags column changes, so the tag index survives other syncs
+        self.tag_index = None
+        self.tag_index_version = -1
+
+        for prospect in prospects:
+            self.upsert(prospect)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, prospect_id):
+        """Row position of a prospect id"""
+        return self._positions.get(prospect_id)
+
+    def grade(self, position):
+        """Grade label for a row ('' when ungraded)"""
+        return self.grade_labels[self.grade_codes[position]]
+
+    def _encode(self, name, kind, prospect_id, value):
+        if kind == 'text':
+            return _to_text(value)
+        if kind == 'score':
+            return _to_score(value)
+        if kind == 'grade':
+            label = _to_text(value)
+            code = self._grade_codes.get(label)
+            if code is None:
+                code = len(self.grade_labels)
+                self._grade_codes[label] = code
+                self.grade_labels.append(label)
+            return code
+
+        epoch = _to_epoch(value)
+        if epoch == BAD_DATE:
+            self.unparsed_dates[(name, prospect_id)] = value
+        else:
+            self.unparsed_dates.pop((name, prospect_id), None)
+        return epoch
+
+    def format_date(self, name, position):
+        """Timestamp column value rendered back to an API-style string"""
+        epoch = getattr(self, name)[position]
+        if epoch == NO_DATE:
+            return None
+        if epoch == BAD_DATE:
+            return self.unparsed_dates.get((name, self.ids[position]))
+        return format_iso(epoch)
+
+    def render(self, name, position):
+        """One column value rendered the way the API sent it"""
+        kind = COLUMNS[name][1]
+        if kind == 'date':
+            return self.format_date(name, position)
+        if kind == 'grade':
+            return self.grade(position) or None
+        if kind == 'score':
+            return self.scores[position]
+        return getattr(self, name)[position] or None
+
+    def to_dict(self, position):
+        """Render one row in the API's prospect JSON shape"""
+        record = {'id': self.ids[position]}
+        for name, (field, _) in COLUMNS.items():
+            record[field] = self.render(name, position)
+        record['tags'] = list(self.tags[position])
+        return record
+
+    def row(self, position):
+        """Dict-style view of one row that renders only the fields read from it"""
+        return SnapshotRow(self, position)
+
+    def rows(self):
+        """Yield a SnapshotRow per row"""
+        for position in range(len(self.ids)):
+            yield SnapshotRow(self, position)
+
+    def record(self, prospect_id):
+        """Prospect dict for an id"""
+        position = self.position(prospect_id)
+        return self.to_dict(position) if position is not None else {}
+
+    def records(self, prospect_ids=None):
+        """Prospect dicts for the given ids (every row when omitted)"""
+        if prospect_ids is None:
+            return list(self.iter_records())
+        return [self.record(prospect_id) for prospect_id in prospect_ids]
+
+    def iter_records(self):
+        """Yield every row as a prospect dict without building the full list"""
+        for position in range(len(self.ids)):
+            yield self.to_dict(position)
+
+    def upsert(self, prospect):
+        """Insert or replace one prospect row, returning its position"""
+        prospect_id = int(prospect.get('id'))
+        position = self._positions.get(prospect_id)
+        self.version += 1
+
+        if position is None:
+            position = len(self.ids)
+            self._positions[prospect_id] = position
+            self.ids.append(prospect_id)
+            for name, (field, kind) in COLUMNS.items():
+                getattr(self, name).append(self._encode(name, kind, prospect_id, prospect.get(field)))
+            self.tags.append(())
+        else:
+            for name, (field, kind) in COLUMNS.items():
+                getattr(self, name)[position] = self._encode(name, kind, prospect_id, prospect.get(field))
+
+        return position
+
+    def remove(self, prospect_id):
+        """Delete one prospect row by moving the last row into its slot"""
+        position = self._positions.pop(prospect_id, None)
+        if position is None:
+            return False
+
+        self.version += 1
+        if self.tags[position]:
+            self.tags_version += 1  # The tag index still lists this prospect
+        for name, (_, kind) in COLUMNS.items():
+            if kind == 'date':
+                self.unparsed_dates.pop((name, prospect_id), None)
+
+        last = len(self.ids) - 1
+        if position != last:
+            moved_id = self.ids[last]
+            self._positions[moved_id] = position
+            self.ids[position] = moved_id
+            for name in COLUMNS:
+                column = getattr(self, name)
+                column[position] = column[last]
+            self.tags[position] = self.tags[last]
+
+        self.ids.pop()
+        for name in COLUMNS:
+            getattr(self, name).pop()
+        self.tags.pop()
+        return True
+
+    def set_tags(self, assignments):
+        """Replace every row's tags from a prospect id -> tag names mapping"""
+        changed = False
+        for position, prospect_id in enumerate(self.ids):
+            tags = tuple(sorted({_to_text(tag) for tag in assignments.get(prospect_id, ()) if tag}))
+            if tags != self.tags[position]:
+                self.tags[position] = tags
+                changed = True
+        if changed:
+            self.version += 1
+            self.tags_version += 1
+        self.tags_synced = True
+        return changed
+
+
+class SnapshotRow:
+    """Read-only, dict-style access to one snapshot row.
+
+    get() renders a single field exactly as to_dict() would, so code written
+    against prospect dicts can run over the snapshot without building a dict
+    per row.
+    """
+
+    __slots__ = ('snapshot', 'position')
+
+    def __init__(self, snapshot, position):
+        self.snapshot = snapshot
+        self.position = position
+
+    def get(self, field, default=None):
+        if field == 'id':
+            return self.snapshot.ids[self.position]
+        if field == 'tags':
+            return list(self.snapshot.tags[self.position])
+        name = FIELD_COLUMNS.get(field)
+        if name is None:
+            return default
+        return self.snapshot.render(name, self.position)
@@ -0,0 +1,186 @@
+import threading
+import time
+from utils.pardot_client import PardotApiError, iter_pages, iter_partitioned_pages
+from utils.date_utils import now_epoch, format_iso
+from .prospect_snapshot import ProspectSnapshot
+from .utm_audit_engine import UTM_FIELDS
+
+PROSPECT_FIELDS = "id,email,firstName,lastName,company,country,jobTitle,score,grade,lastActivityAt,createdAt,updatedAt"
+# Custom fields synced alongside the core fields when the account defines them (UTM audit)
+OPTIONAL_FIELDS = ",".join(UTM_FIELDS)
+PAGE_SIZE = 1000
+RECONCILE_INTERVAL = 24 * 3600  # Seconds between deletion reconciliation passes
+TAG_SYNC_INTERVAL = 3600  # Seconds between re-reads of prospect tag assignments
+PARTITION_BY = "id"  # Full crawls run as concurrent id range partitions
+
+
+class ProspectStore:
+    """Local prospect table for one business unit, kept current by watermark syncs"""
+
+    def __init__(self):
+        self.snapshot = ProspectSnapshot()
+        self.watermark = None  # updatedAt of the newest record seen, as sent by Pardot
+        self.watermark_epoch = -1
+        self.reconciled_at = 0
+        self.tags_synced_at = 0
+        self.health = None  # HealthIndex kept in step with the snapshot
+        self.fields = None  # Fields requested for this business unit, chosen on first sync
+        self.lock = threading.RLock()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_prospect_store(business_unit_id):
+    """Return the prospect store for a business unit, creating it on first use"""
+    with _stores_lock:
+        if business_unit_id not in _stores:
+            _stores[business_unit_id] = ProspectStore()
+        return _stores[business_unit_id]
+
+
+def _select_fields(store, headers):
+    """Core plus optional fields, falling back to core fields if the account lacks the custom ones"""
+    if store.fields is None:
+        fields = f"{PROSPECT_FIELDS},{OPTIONAL_FIELDS}"
+        try:
+            next(iter_pages("prospects", headers, {"fields": fields, "limit": 1}), None)
+        except PardotApiError as e:
+            if e.status_code != 400:
+                raise
+            print(f"Optional prospect fields unavailable, syncing core fields only: {e}")
+            fields = PROSPECT_FIELDS
+        store.fields = fields
+    return store.fields
+
+
+def _apply_page(store, prospects, upserted, seen=None):
+    """Upsert a page of prospects, recording ids whose updatedAt changed.
+
+    Returns the page's newest (updatedAt epoch, updatedAt); the caller
+    moves the watermark only once the whole crawl has succeeded.
+    """
+    snapshot = store.snapshot
+    newest = (-1, None)
+
+    for prospect in prospects:
+        prospect_id = int(prospect.get('id'))
+        if seen is not None:
+            seen.add(prospect_id)
+
+        position = snapshot.position(prospect_id)
+        previous = snapshot.updated_at[position] if position is not None else None
+        position = snapshot.upsert(prospect)
+        updated = snapshot.updated_at[position]
+
+        if previous is None or previous != updated:
+            upserted.append(prospect_id)
+        if updated > newest[0]:
+            newest = (updated, prospect.get('updatedAt'))
+    return newest
+
+
+def _remove_missing(store, live_ids):
+    """Drop prospects that no longer exist in Pardot"""
+    deleted = [prospect_id for prospect_id in store.snapshot.ids if prospect_id not in live_ids]
+    for prospect_id in deleted:
+        store.snapshot.remove(prospect_id)
+    return deleted
+
+
+def reconcile_deletions(store, headers):
+    """Compare local ids against the live id list and remove deleted prospects"""
+    live_ids = set()
+    for page in iter_partitioned_pages("prospects", headers, {"fields": "id", "limit": PAGE_SIZE}, PARTITION_BY):
+        live_ids.update(int(prospect.get('id')) for prospect in page)
+
+    store.reconciled_at = time.time()
+    return _remove_missing(store, live_ids)
+
+
+def sync_tags(store, headers):
+    """Load every prospect's tag names into the snapshot.
+
+    Assigning a tag does not change a prospect's updatedAt, so assignments
+    are re-read in full rather than through the watermark.
+    """
+    names = {}
+    for page in iter_pages("tags", headers, {"fields": "id,name", "limit": PAGE_SIZE}):
+        for tag in page:
+            names[tag.get('id')] = tag.get('name')
+
+    assignments = {}
+    for page in iter_pages("tag-objects", headers, {"fields": "tagId,objectType,objectId", "limit": PAGE_SIZE}):
+        for tag_object in page:
+            if tag_object.get('objectType') != "Prospect" or tag_object.get('tagId') not in names:
+                continue
+            assignments.setdefault(int(tag_object.get('objectId')), []).append(names[tag_object.get('tagId')])
+
+    store.snapshot.set_tags(assignments)
+    store.tags_synced_at = time.time()
+    return len(assignments)
+
+
+def sync_prospects(store, headers, full=False):
+    """Bring a prospect store up to date.
+
+    The first sync (or full=True) crawls every prospect as concurrent id range
+    partitions; later syncs only ask for records updated since the watermark
+    and reconcile deletions every RECONCILE_INTERVAL seconds. The watermark
+    only moves after a crawl succeeds, so a failed first crawl is retried in
+    full. Tags are re-read after a full crawl and every TAG_SYNC_INTERVAL
+    seconds. Returns the ids that changed.
+    """
+    with store.lock:
+        upserted = []
+        deleted = []
+        fields = _select_fields(store, headers)
+
+        try:
+            if full or store.watermark is None:
+                seen = set()
+                started = now_epoch()
+                newest = (-1, None)
+                for page in iter_partitioned_pages("prospects", headers, {"fields": fields, "limit": PAGE_SIZE}, PARTITION_BY):
+                    newest = max(newest, _apply_page(store, page, upserted, seen), key=lambda mark: mark[0])
+                deleted = _remove_missing(store, seen)
+                # Partitions finish out of order, so an early partition may have missed
+                # edits made while later ones ran; resume from the crawl start instead
+                if newest[0] < 0 or newest[0] > started:
+                    newest = (started, format_iso(started))
+                store.watermark_epoch, store.watermark = newest
+                store.reconciled_at = time.time()
+                mode = "full"
+            else:
+                params = {
+                    "fields": fields,
+                    "limit": PAGE_SIZE,
+                    "updatedAtAfterOrEqualTo": store.watermark
+                }
+                newest = (store.watermark_epoch, store.watermark)
+                for page in iter_pages("prospects", headers, params):
+                    newest = max(newest, _apply_page(store, page, upserted), key=lambda mark: mark[0])
+                store.watermark_epoch, store.watermark = newest
+                if time.time() - store.reconciled_at > RECONCILE_INTERVAL:
+                    deleted = reconcile_deletions(store, headers)
+                mode = "incremental"
+        except Exception:
+            # Pages applied before the failure are not reflected in the health index; rebuild it next time
+            store.health = None
+            raise
+
+        if mode == "full" or time.time() - store.tags_synced_at > TAG_SYNC_INTERVAL:
+            try:
+                sync_tags(store, headers)
+            except Exception as e:
+                # Prospects stay usable without tags; the tag filter is skipped until a tag sync succeeds
+                print(f"Error syncing prospect tags: {str(e)}")
+
+        print(f"Prospect sync ({mode}): {len(upserted)} upserted, {len(deleted)} deleted, {len(store.snapshot)} total")
+
+        return {
+            "mode": mode,
+            "upserted": upserted,
+            "deleted": deleted
+        }
@@ -0,0 +1,142 @@
+import json
+import os
+from array import array
+from config.settings import UTM_ALLOWED_VALUES_FILE
+from .prospect_snapshot import COLUMNS
+
+UTM_FIELDS = ["utm_campaign__c", "utm_medium__c", "utm_source__c", "utm_term__c"]
+
+UTM_LABELS = {
+    "utm_campaign__c": "UTM Campaign",
+    "utm_medium__c": "UTM Medium",
+    "utm_source__c": "UTM Source",
+    "utm_term__c": "UTM Term",
+}
+
+# Per-value status codes
+VALID = 0
+MISSING = 1
+INVALID = 2
+
+# Issue bitmask layout: bit i = UTM_FIELDS[i] missing, bit 4 + i = UTM_FIELDS[i] invalid
+INVALID_SHIFT = len(UTM_FIELDS)
+
+_allowed_values = {}  # business unit id -> {field: frozenset of lowercase values}
+_allowed_values_mtime = None
+
+
+def get_allowed_values(business_unit_id=None):
+    """Allowed UTM value sets for a business unit, reloaded when the config file changes"""
+    global _allowed_values_mtime
+
+    try:
+        mtime = os.path.getmtime(UTM_ALLOWED_VALUES_FILE)
+    except OSError:
+        mtime = None
+    if mtime != _allowed_values_mtime:
+        _allowed_values.clear()
+        _allowed_values_mtime = mtime
+
+    if business_unit_id not in _allowed_values:
+        config = {}
+        if mtime is not None:
+            with open(UTM_ALLOWED_VALUES_FILE) as f:
+                config = json.load(f)
+        fields = dict(config.get("default", {}))
+        fields.update(config.get(business_unit_id, {}) if business_unit_id else {})
+        _allowed_values[business_unit_id] = {
+            field: frozenset(str(value).strip().lower() for value in values)
+            for field, values in fields.items()
+        }
+    return _allowed_values[business_unit_id]
+
+
+def _column_statuses(values, allowed):
+    """Status byte per value of one column; each distinct value is classified once"""
+    classified = {}
+    statuses = bytearray(len(values))
+    for i, value in enumerate(values):
+        status = classified.get(value)
+        if status is None:
+            text = "" if value is None else str(value).strip()
+            if not text:
+                status = MISSING
+            elif allowed is not None and text.lower() not in allowed:
+                status = INVALID
+            else:
+                status = VALID
+            classified[value] = status
+        statuses[i] = status
+    return statuses
+
+
+class UtmAudit:
+    """UTM issues for a prospect set, stored once as id/email/bitmask columns.
+
+    Each UTM column is classified as a whole and turned into a per-row bitmask
+    with bytes.translate; the four masks are OR-ed as big integers. Only rows
+    with a non-zero mask are kept, and every view (preview, pages, export rows)
+    is rendered from those columns on demand.
+    """
+
+    def __init__(self, ids, emails, columns, allowed_values):
+        self.total = len(ids)
+        self.field_counts = {}
+        combined = 0
+
+        for bit, field in enumerate(UTM_FIELDS):
+            statuses = _column_statuses(columns.get(field) or [None] * self.total, allowed_values.get(field))
+            self.field_counts[field] = {
+                "missing": statuses.count(MISSING),
+                "invalid": statuses.count(INVALID)
+            }
+            table = bytearray(256)
+            table[MISSING] = 1 << bit
+            table[INVALID] = 1 << (bit + INVALID_SHIFT)
+            combined |= int.from_bytes(statuses.translate(table), "big")
+
+        masks = combined.to_bytes(self.total, "big") if self.total else b""
+        rows = [i for i, mask in enumerate(masks) if mask]
+        self.ids = array('q', [int(ids[i]) for i in rows])
+        self.emails = [emails[i] for i in rows]
+        self.masks = bytes(masks[i] for i in rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def issue(self, i):
+        """Issue i in the {prospect_id, email, missing_fields, invalid_fields} shape"""
+        mask = self.masks[i]
+        return {
+            "prospect_id": self.ids[i],
+            "email": self.emails[i],
+            "missing_fields": [field for bit, field in enumerate(UTM_FIELDS) if mask & (1 << bit)],
+            "invalid_fields": [field for bit, field in enumerate(UTM_FIELDS) if mask & (1 << (bit + INVALID_SHIFT))]
+        }
+
+    def issues(self, start=0, stop=None):
+        """Issues in [start, stop)"""
+        return [self.issue(i) for i in range(*slice(start, stop).indices(len(self)))]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.issue(i) for i in range(*index.indices(len(self)))]
+        return self.issue(index)
+
+    def export_rows(self):
+        """Yield issues as Yes/No rows for spreadsheet export"""
+        for i in range(len(self)):
+            mask = self.masks[i]
+            row = {"Prospect ID": self.ids[i], "Email": self.emails[i] or ""}
+            for bit, field in enumerate(UTM_FIELDS):
+                row[f"{UTM_LABELS[field]} Missing"] = "Yes" if mask & (1 << bit) else "No"
+            for bit, field in enumerate(UTM_FIELDS):
+                if field != "utm_term__c":  # The export has never had a Term Invalid column
+                    row[f"{UTM_LABELS[field]} Invalid"] = "Yes" if mask & (1 << (bit + INVALID_SHIFT)) else "No"
+            yield row
+
+
+def audit_snapshot(snapshot, allowed_values):
+    """Run the UTM audit straight over a prospect snapshot's UTM columns"""
+    columns = {field: getattr(snapshot, name) for name, (field, _) in COLUMNS.items() if field in UTM_FIELDS}
+    return UtmAudit(snapshot.ids, snapshot.emails, columns, allowed_values)
@@ -1,92 +1,15 @@
-import requests
-import datetime
-from dateutil import parser
 from utils.auth_utils import get_credentials
+from utils.date_utils import format_iso
+from .campaign_engine import TREND_MONTHS, recent_months, sync_campaign_index
+from .utm_audit_engine import audit_snapshot, get_allowed_values
+from .prospect_service import build_prospect_health, paginate, DEFAULT_PAGE_SIZE
+from .prospect_store import OPTIONAL_FIELDS, get_prospect_store
 
-def get_prospects_with_utm(headers):
-    """Get prospects with UTM fields using nextPageUrl pagination"""
-    all_prospects = []
-    url = "https://pi.pardot.com/api/v5/objects/prospects"
-    params = {
-        "fields": "id,email,utm_campaign__c,utm_medium__c,utm_source__c,utm_term__c",
-        "limit": 200
-    }
-    
-    while url:
-        response = requests.get(url, headers=headers, params=params if url.endswith("prospects") else None)
-        
-        if response.status_code != 200:
-            raise Exception(f"Failed to get prospects: {response.status_code} - {response.text}")
-        
-        data = response.json()
-        prospects = data.get("values", [])
-        all_prospects.extend(prospects)
-        
-        url = data.get("nextPageUrl")
-        params = None  # Clear params for subsequent requests
-        
-        # Limit to prevent timeout
-        if len(all_prospects) >= 10000:
-            break
-    
-    return all_prospects
+# Latest UTM audit per business unit, for paging through issues after an analysis run
+utm_audits = {}
 
-def analyze_utm_parameters(prospects_data):
-    """Analyze UTM parameters for missing/invalid values"""
-    allowed_values = {
-        "utm_source__c": ["google", "linkedin", "facebook"],
-        "utm_medium__c": ["cpc", "email", "social"],
-        "utm_campaign__c": ["spring_sale", "newsletter", "webinar"]
-    }
-    
-    utm_fields = ["utm_campaign__c", "utm_medium__c", "utm_source__c", "utm_term__c"]
-    audit_results = []
-    
-    for prospect in prospects_data:
-        prospect_id = prospect.get("id")
-        email = prospect.get("email")
-        missing_fields = []
-        invalid_fields = []
-        
-        for field in utm_fields:
-            value = prospect.get(field)
-            
-            if value is None or str(value).strip() == "":
-                missing_fields.append(field)
-            else:
-                value_str = str(value).strip().lower()
-                if field in allowed_values and value_str not in allowed_values[field]:
-                    invalid_fields.append(field)
-        
-        if missing_fields or invalid_fields:
-            audit_results.append({
-                "prospect_id": prospect_id,
-                "email": email,
-                "missing_fields": missing_fields,
-                "invalid_fields": invalid_fields
-            })
-    
-    return audit_results
-
-def format_utm_issues_for_export(utm_issues):
-    """Format UTM issues for Google Sheets export with Yes/No flags"""
-    formatted_data = []
-    
-    for issue in utm_issues:
-        row = {
-            "Prospect ID": issue.get("prospect_id", ""),
-            "Email": issue.get("email", ""),
-            "UTM Campaign Missing": "Yes" if "utm_campaign__c" in issue.get("missing_fields", []) else "No",
-            "UTM Medium Missing": "Yes" if "utm_medium__c" in issue.get("missing_fields", []) else "No",
-            "UTM Source Missing": "Yes" if "utm_source__c" in issue.get("missing_fields", []) else "No",
-            "UTM Term Missing": "Yes" if "utm_term__c" in issue.get("missing_fields", []) else "No",
-            "UTM Campaign Invalid": "Yes" if "utm_campaign__c" in issue.get("invalid_fields", []) else "No",
-            "UTM Medium Invalid": "Yes" if "utm_medium__c" in issue.get("invalid_fields", []) else "No",
-            "UTM Source Invalid": "Yes" if "utm_source__c" in issue.get("invalid_fields", []) else "No"
-        }
-        formatted_data.append(row)
-    
-    return formatted_data
+# Issues included inline in the analysis payload
+UTM_PREVIEW_SIZE = 20
 
 def get_utm_analysis(access_token):
     """Main function to run UTM audit"""
@@ -96,23 +19,23 @@ def get_utm_analysis(access_token):
             raise ValueError("Invalid access token")
             
         credentials = get_credentials()
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Pardot-Business-Unit-Id": credentials['business_unit_id'],
-            "Content-Type": "application/json"
-        }
         
-        prospects_data = get_prospects_with_utm(headers)
-        audit_results = analyze_utm_parameters(prospects_data)
+        # Same synced snapshot as prospect health and filters, so no second crawl
+        store = get_prospect_store(credentials['business_unit_id'])
+        with store.lock:
+            snapshot, _ = build_prospect_health(access_token)
+            if OPTIONAL_FIELDS not in store.fields:
+                raise Exception("UTM fields are not defined on this account's prospects")
+            audit = audit_snapshot(snapshot, get_allowed_values(credentials['business_unit_id']))
+        utm_audits[credentials['business_unit_id']] = audit
         
         return {
             "utm_analysis": {
-                "total_prospects_analyzed": len(prospects_data),
-                "prospects_with_utm_issues": len(audit_results),
-                "utm_issues": audit_results[:20],
-                "all_utm_issues": audit_results,
-                "export_data": format_utm_issues_for_export(audit_results),
-                "summary": f"Analyzed {len(prospects_data)} prospects, found {len(audit_results)} with UTM issues"
+                "total_prospects_analyzed": audit.total,
+                "prospects_with_utm_issues": len(audit),
+                "field_counts": audit.field_counts,
+                "utm_issues": audit.issues(0, UTM_PREVIEW_SIZE),
+                "summary": f"Analyzed {audit.total} prospects, found {len(audit)} with UTM issues"
             }
         }
         
@@ -128,77 +51,33 @@ def get_utm_analysis(access_token):
             }
         }
 
-# ===== CAMPAIGN ENGAGEMENT CHECKER =====
-
-def fetch_all_campaigns(headers):
-    """Fetch all Pardot campaigns"""
-    all_campaigns = []
-    url = "https://pi.pardot.com/api/v5/objects/campaigns"
-    params = {"fields": "id,name,createdAt,updatedAt,cost", "limit": 200}
-    
-    while url:
-        response = requests.get(url, headers=headers, params=params if url.endswith("campaigns") else None)
-        if response.status_code != 200:
-            raise Exception(f"Failed to get campaigns: {response.status_code} - {response.text}")
-        
-        data = response.json()
-        all_campaigns.extend(data.get("values", []))
-        url = data.get("nextPageUrl")
-        params = None
+def get_utm_issues_page(page=1, page_size=DEFAULT_PAGE_SIZE):
+    """One page of UTM issues from the last audit of the current business unit"""
+    audit = utm_audits.get(get_credentials()['business_unit_id'])
+    if audit is None:
+        return None
     
-    return all_campaigns
+    issues, meta = paginate(audit, page, page_size)
+    return {
+        "total_issues": meta["total"],
+        "utm_issues": issues,
+        "pagination": meta
+    }
 
-def fetch_campaign_assets(headers, endpoint, asset_type):
-    """Generic function to fetch campaign assets"""
-    assets = []
-    url = f"https://pi.pardot.com/api/v5/objects/{endpoint}"
-    params = {"fields": "id,campaignId,createdAt", "limit": 200}
-    
-    while url:
-        response = requests.get(url, headers=headers, params=params if url.endswith(endpoint) else None)
-        if response.status_code == 200:
-            data = response.json()
-            assets.extend(data.get("values", []))
-            url = data.get("nextPageUrl")
-            params = None
-        else:
-            break
-    return assets
+def get_utm_export_rows():
+    """Spreadsheet rows for the last audit of the current business unit, or None before any audit"""
+    audit = utm_audits.get(get_credentials()['business_unit_id'])
+    if audit is None:
+        return None
+    return list(audit.export_rows())
 
-def fetch_all_campaign_related_data(headers):
-    """Fetch all campaign-related assets"""
-    endpoints = {
-        "prospects": "prospects",
-        "emails": "list-emails", 
-        "forms": "forms",
-        "landing_pages": "landing-pages",
-        "custom_redirects": "custom-redirects",
-        "files": "files"
-    }
-    
-    all_data = {}
-    for asset_type, endpoint in endpoints.items():
-        all_data[asset_type] = fetch_campaign_assets(headers, endpoint, asset_type)
-    
-    return all_data
+# ===== CAMPAIGN ENGAGEMENT CHECKER =====
 
-def check_campaign_activity_with_data(campaign_id, all_data, months_back):
+def check_campaign_activity_with_data(campaign_id, campaign_index, months_back):
     """Check if campaign has activity in timeframe"""
     try:
-        cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=int(months_back) * 30)
-        asset_types = ["prospects", "emails", "forms", "landing_pages", "custom_redirects", "files"]
-        
-        for asset_type in asset_types:
-            for item in all_data[asset_type]:
-                if str(item.get("campaignId")) == str(campaign_id):
-                    try:
-                        created_date = parser.parse(item.get("createdAt"))
-                        if created_date > cutoff_date:
-                            return "active"
-                    except:
-                        continue
-        return "inactive"
-    except:
+        return "active" if campaign_index.is_active(campaign_id, months_back) else "inactive"
+    except (ValueError, TypeError):
         return "inactive"
 
 def get_campaign_engagement_analysis(months_back="6"):
@@ -224,22 +103,30 @@ def get_campaign_engagement_analysis(months_back="6"):
             "Content-Type": "application/json"
         }
         
-        campaigns = fetch_all_campaigns(headers)
-        all_data = fetch_all_campaign_related_data(headers)
+        # Campaigns and per-month asset rollups; a recent sync is reused so window toggles are instant
+        campaign_index = sync_campaign_index(credentials['business_unit_id'], headers)
+        campaigns = campaign_index.campaigns
+        trend_months = recent_months(TREND_MONTHS)
+        window_months = recent_months(int(months_back))
         
         active_campaigns = []
         inactive_campaigns = []
         
         for campaign in campaigns:
-            status = check_campaign_activity_with_data(campaign.get("id"), all_data, months_back)
+            campaign_id = campaign.get("id")
+            status = check_campaign_activity_with_data(campaign_id, campaign_index, months_back)
+            last_activity = campaign_index.last_activity(campaign_id)
             
             campaign_data = {
-                "id": campaign.get("id"),
+                "id": campaign_id,
                 "name": campaign.get("name", "Unknown"),
                 "created_at": campaign.get("createdAt"),
                 "updated_at": campaign.get("updatedAt"),
                 "cost": campaign.get("cost", 0),
-                "status": status
+                "status": status,
+                "last_activity_at": format_iso(last_activity) if last_activity is not None else None,
+                "assets_in_window": campaign_index.assets_by_type(campaign_id, window_months),
+                "monthly_trend": campaign_index.monthly_totals(campaign_id, trend_months)
             }
             
             if status == "active":
@@ -252,13 +139,22 @@ def get_campaign_engagement_analysis(months_back="6"):
             "Campaign ID": c["id"],
             "Campaign Name": c["name"],
             "Status": c["status"].title(),
+            "Last Activity": c["last_activity_at"],
             "Created Date": c["created_at"],
             "Last Updated": c["updated_at"],
             "Cost": c["cost"]
         } for c in active_campaigns + inactive_campaigns]
         
+        # Asset types that failed to sync; campaigns relying on them may be wrongly inactive
+        errors = dict(campaign_index.errors)
+        summary = f"Total: {len(campaigns)} campaigns - {len(active_campaigns)} active, {len(inactive_campaigns)} inactive (based on last {months_back} months activity)"
+        if errors:
+            summary += f" - partial: {', '.join(sorted(errors))} could not be fetched"
+
         return {
             "campaign_engagement_analysis": {
+                "status": "PARTIAL" if errors else "OK",
+                "errors": errors,
                 "total_campaigns_analyzed": len(campaigns),
                 "active_campaigns_count": len(active_campaigns),
                 "inactive_campaigns_count": len(inactive_campaigns),
@@ -266,7 +162,8 @@ def get_campaign_engagement_analysis(months_back="6"):
                 "inactive_campaigns": inactive_campaigns,
                 "export_data": export_data,
                 "months_analyzed": months_back,
-                "summary": f"Total: {len(campaigns)} campaigns - {len(active_campaigns)} active, {len(inactive_campaigns)} inactive (based on last {months_back} months activity)",
+                "trend_months": trend_months,
+                "summary": summary,
                 "breakdown": {
                     "active_percentage": round((len(active_campaigns) / len(campaigns)) * 100, 1) if campaigns else 0,
                     "inactive_percentage": round((len(inactive_campaigns) / len(campaigns)) * 100, 1) if campaigns else 0
@@ -0,0 +1,214 @@
+import calendar
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from config.settings import PARDOT_TIMEZONE
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+try:
+    from dateutil import parser as dateutil_parser
+except ImportError:
+    dateutil_parser = None
+
+# Naive Pardot timestamps (v4 "created_at") are in the account timezone;
+# with no PARDOT_TIMEZONE configured they are read as server local time.
+PARDOT_TZ = ZoneInfo(PARDOT_TIMEZONE) if PARDOT_TIMEZONE and ZoneInfo else None
+
+V4_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _naive_epoch(fields):
+    """Epoch seconds for a naive (year, month, day, hour, minute, second) tuple"""
+    if PARDOT_TZ is not None:
+        return int(datetime(*fields, tzinfo=PARDOT_TZ).timestamp())
+    return int(time.mktime(fields + (0, 0, -1)))
+
+
+def _fallback_epoch(value):
+    """Slow path for formats the specialized parser does not recognise"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        if dateutil_parser is None:
+            return None
+        try:
+            parsed = dateutil_parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+
+    if parsed.tzinfo is None:
+        return _naive_epoch(parsed.timetuple()[:6])
+    return int(parsed.timestamp())
+
+
+@lru_cache(maxsize=131072)
+def _parse(value):
+    """Parse one timestamp string to epoch seconds, specialised for Pardot's formats"""
+    text = value.strip()
+    try:
+        # 2024-07-03T02:07:35-07:00 (v5), 2024-07-19 02:46:04 (v4), optional fraction / Z
+        if len(text) >= 19 and text[4] == '-' and text[7] == '-' and text[10] in 'T ' and text[13] == ':' and text[16] == ':':
+            fields = (int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                      int(text[11:13]), int(text[14:16]), int(text[17:19]))
+            rest = text[19:]
+            if rest[:1] == '.':
+                rest = rest[1:].lstrip('0123456789')
+
+            if not rest:
+                return _naive_epoch(fields)
+            if rest in ('Z', 'z', '+00:00'):
+                return calendar.timegm(fields)
+            if len(rest) == 6 and rest[0] in '+-' and rest[3] == ':':
+                offset = int(rest[1:3]) * 3600 + int(rest[4:6]) * 60
+                return calendar.timegm(fields) - (offset if rest[0] == '+' else -offset)
+
+        # 2024-07-19
+        elif len(text) == 10 and text[4] == '-' and text[7] == '-':
+            return _naive_epoch((int(text[0:4]), int(text[5:7]), int(text[8:10]), 0, 0, 0))
+    except ValueError:
+        pass
+
+    return _fallback_epoch(text)
+
+
+def parse_timestamp(value):
+    """Convert a Pardot timestamp string to epoch seconds, or None if empty or unparseable"""
+    if not value:
+        return None
+    return _parse(str(value))
+
+
+def now_epoch():
+    """Current time as epoch seconds"""
+    return int(time.time())
+
+
+def to_datetime(epoch):
+    """Aware datetime for an epoch, in the Pardot account timezone"""
+    if PARDOT_TZ is not None:
+        return datetime.fromtimestamp(epoch, PARDOT_TZ)
+    return datetime.fromtimestamp(epoch, timezone.utc).astimezone()
+
+
+def format_v4(epoch):
+    """Format an epoch the way the v4 API expects created_after/created_before"""
+    return to_datetime(epoch).strftime(V4_FORMAT)
+
+
+def format_iso(epoch):
+    """Format an epoch as a v5-style ISO 8601 timestamp with offset"""
+    return to_datetime(epoch).isoformat()
+
+
+# ===== Date windows =====
+
+# Rolling windows end at "now" rounded up to this many seconds, so requests made
+# moments apart resolve to the same window and share cache keys.
+WINDOW_GRANULARITY = 300
+
+ROLLING_WINDOW_DAYS = {
+    "last_7_days": 7,
+    "last_30_days": 30,
+    "last_3_months": 90,
+    "last_6_months": 180,
+}
+
+DAY_SECONDS = 86400
+
+
+class DateWindow(namedtuple("DateWindow", ["start", "end"])):
+    """Inclusive [start, end] range in epoch seconds; None bounds are open"""
+
+    @property
+    def key(self):
+        """Canonical cache key for the window"""
+        return f"{'' if self.start is None else self.start}:{'' if self.end is None else self.end}"
+
+    def contains(self, epoch):
+        return (self.start is None or epoch >= self.start) and (self.end is None or epoch <= self.end)
+
+    def as_v4(self):
+        """(created_after, created_before) strings for v4 queries"""
+        return (format_v4(self.start) if self.start is not None else None,
+                format_v4(self.end) if self.end is not None else None)
+
+
+ALL_TIME = DateWindow(None, None)
+
+
+def _canonical_filter(filter_type):
+    """Map 'Last 7 Days' / 'last_7_days' / 'LAST-7-DAYS' to one spelling"""
+    return (filter_type or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _midnight(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(year, month, tzinfo):
+    while month < 1:
+        month += 12
+        year -= 1
+    while month > 12:
+        month -= 12
+        year += 1
+    return datetime(year, month, 1, tzinfo=tzinfo)
+
+
+def _parse_bound(value, end_of_day=False):
+    """Epoch for a custom range bound; bare dates cover the whole day"""
+    epoch = parse_timestamp(value)
+    if epoch is not None and end_of_day and len(str(value).strip()) == 10:
+        epoch += DAY_SECONDS - 1
+    return epoch
+
+
+def resolve_date_window(filter_type=None, start_date=None, end_date=None, now=None):
+    """Resolve a named filter or custom range into a canonical DateWindow.
+
+    Calendar windows snap to period boundaries in the Pardot account timezone
+    and rolling windows end at now rounded up to WINDOW_GRANULARITY, so
+    equivalent requests always produce identical bounds.
+    """
+    name = _canonical_filter(filter_type)
+
+    if start_date or end_date or name == "custom":
+        return DateWindow(_parse_bound(start_date) if start_date else None,
+                          _parse_bound(end_date, end_of_day=True) if end_date else None)
+
+    now = int(now if now is not None else now_epoch())
+    snapped_now = -(-now // WINDOW_GRANULARITY) * WINDOW_GRANULARITY
+    current = to_datetime(now)
+    tz = current.tzinfo
+    today = _midnight(current)
+
+    if name in ROLLING_WINDOW_DAYS:
+        return DateWindow(snapped_now - ROLLING_WINDOW_DAYS[name] * DAY_SECONDS, snapped_now)
+
+    quarter_month = ((current.month - 1) // 3) * 3 + 1
+    to_date_starts = {
+        "today": today,
+        "this_month": _month_start(current.year, current.month, tz),
+        "this_quarter": _month_start(current.year, quarter_month, tz),
+        "this_year": _month_start(current.year, 1, tz),
+    }
+    if name in to_date_starts:
+        return DateWindow(int(to_date_starts[name].timestamp()), snapped_now)
+
+    closed_periods = {
+        "yesterday": (today - timedelta(days=1), today),
+        "last_week": (today - timedelta(days=current.weekday() + 7), today - timedelta(days=current.weekday())),
+        "last_month": (_month_start(current.year, current.month - 1, tz), _month_start(current.year, current.month, tz)),
+        "last_quarter": (_month_start(current.year, quarter_month - 3, tz), _month_start(current.year, quarter_month, tz)),
+        "last_year": (_month_start(current.year - 1, 1, tz), _month_start(current.year, 1, tz)),
+    }
+    if name in closed_periods:
+        period_start, next_start = closed_periods[name]
+        return DateWindow(int(period_start.timestamp()), int(next_start.timestamp()) - 1)
+
+    return ALL_TIME
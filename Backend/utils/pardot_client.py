@@ -0,0 +1,158 @@
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config.settings import PARDOT_MAX_CONCURRENCY, PARDOT_REQUESTS_PER_SECOND
+from utils.date_utils import parse_timestamp, format_iso
+
+PARDOT_V5_BASE = "https://pi.pardot.com/api/v5/objects"
+
+MAX_RETRIES = 3  # Attempts per request after a 429 response
+
+# Partitions per worker; extra partitions keep workers busy when id ranges are unevenly filled
+PARTITIONS_PER_WORKER = 4
+
+# Partition field -> (lower bound filter, upper bound filter)
+PARTITION_FILTERS = {
+    "id": ("idGreaterThanOrEqualTo", "idLessThan"),
+    "createdAt": ("createdAtAfterOrEqualTo", "createdAtBefore"),
+}
+
+
+class PardotApiError(Exception):
+    """Non-200 response from the Pardot API"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """Caps concurrent requests and spaces request starts to a fixed rate"""
+
+    def __init__(self, max_concurrent, per_second):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.interval = 1.0 / per_second if per_second > 0 else 0
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.slots.acquire()
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+        return False
+
+
+# Shared by every Pardot call so parallel crawls stay within the account's limits
+rate_limiter = RateLimiter(PARDOT_MAX_CONCURRENCY, PARDOT_REQUESTS_PER_SECOND)
+
+
+def pardot_get(url, headers, params=None):
+    """GET a Pardot URL under the shared rate limiter, retrying when throttled"""
+    for attempt in range(MAX_RETRIES + 1):
+        with rate_limiter:
+            response = requests.get(url, headers=headers, params=params)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+
+        retry_after = response.headers.get("Retry-After", "")
+        delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+        print(f"Pardot throttled {url}, retrying in {delay}s")
+        time.sleep(delay)
+
+
+def iter_pages(endpoint, headers, params=None):
+    """Yield each page of values from a v5 object endpoint, following nextPageUrl"""
+    url = f"{PARDOT_V5_BASE}/{endpoint}"
+
+    while url:
+        response = pardot_get(url, headers, params)
+
+        if response.status_code != 200:
+            raise PardotApiError(f"Failed to get {endpoint}: {response.status_code} - {response.text}", response.status_code)
+
+        data = response.json()
+        yield data.get("values", [])
+
+        url = data.get("nextPageUrl")
+        params = None  # nextPageUrl already carries the query
+
+
+def get_object(endpoint, object_id, headers, params=None):
+    """Fetch a single v5 object by id"""
+    response = pardot_get(f"{PARDOT_V5_BASE}/{endpoint}/{object_id}", headers, params)
+    if response.status_code != 200:
+        raise PardotApiError(f"Failed to get {endpoint}/{object_id}: {response.status_code} - {response.text}", response.status_code)
+    return response.json()
+
+
+def _edge_value(endpoint, headers, field, direction):
+    """Smallest (ASC) or largest (DESC) value of a field, or None for an empty table"""
+    page = next(iter_pages(endpoint, headers, {"fields": field, "limit": 1, "orderBy": f"{field} {direction}"}), [])
+    return page[0].get(field) if page else None
+
+
+def partition_ranges(endpoint, headers, partition_by="id", partitions=None):
+    """Split an endpoint's id or createdAt span into half-open [lower, upper) ranges"""
+    partitions = partitions or PARDOT_MAX_CONCURRENCY * PARTITIONS_PER_WORKER
+    low = _edge_value(endpoint, headers, partition_by, "ASC")
+    high = _edge_value(endpoint, headers, partition_by, "DESC")
+    if low is None or high is None:
+        return []
+
+    if partition_by == "createdAt":
+        low, high = parse_timestamp(low), parse_timestamp(high)
+    else:
+        low, high = int(low), int(high)
+
+    span = high + 1 - low
+    step = max(1, -(-span // partitions))
+    bounds = list(range(low, high + 1, step)) + [high + 1]
+
+    if partition_by == "createdAt":
+        bounds = [format_iso(bound) for bound in bounds]
+    return list(zip(bounds, bounds[1:]))
+
+
+def iter_partitioned_pages(endpoint, headers, params=None, partition_by="id", partitions=None):
+    """Crawl an endpoint as concurrent id or createdAt range partitions, yielding pages as partitions finish.
+
+    Every request goes through the shared rate limiter, so the crawl runs as
+    wide as the configured concurrency allows regardless of partition count.
+    If a partition fails (or the caller stops reading), partitions not yet
+    started are cancelled and running ones stop at their next page.
+    """
+    lower_filter, upper_filter = PARTITION_FILTERS[partition_by]
+    ranges = partition_ranges(endpoint, headers, partition_by, partitions)
+    stopped = threading.Event()
+
+    def crawl(lower, upper):
+        query = dict(params or {})
+        query[lower_filter] = lower
+        query[upper_filter] = upper
+        pages = []
+        for page in iter_pages(endpoint, headers, query):
+            if stopped.is_set():
+                break
+            pages.append(page)
+        return pages
+
+    with ThreadPoolExecutor(max_workers=PARDOT_MAX_CONCURRENCY) as executor:
+        futures = [executor.submit(crawl, lower, upper) for lower, upper in ranges]
+        try:
+            for future in as_completed(futures):
+                for page in future.result():
+                    yield page
+        except BaseException:
+            stopped.set()
+            for future in futures:
+                future.cancel()
+            raise
@@ -0,0 +1,35 @@
+import json
+import os
+import re
+import threading
+from config.settings import STATE_DIR
+
+_write_lock = threading.Lock()
+
+
+def _state_path(name):
+    """File path for a state name, made filesystem-safe"""
+    return os.path.join(STATE_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".json")
+
+
+def load_state(name, default=None):
+    """Load a persisted JSON state document, or default if none exists or it is unreadable"""
+    try:
+        with open(_state_path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable state {name}: {str(e)}")
+        return default
+
+
+def save_state(name, data):
+    """Persist a JSON state document atomically"""
+    path = _state_path(name)
+    with _write_lock:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.partial"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
@@ -262,11 +262,12 @@ export default function Dashboard() {
       .finally(() => setLoading(false));
   };
 
-  const getInactiveProspects = () => {
+  const getInactiveProspects = (page = 1) => {
     setLoading(true);
     axios
       .get("http://localhost:4001/get-inactive-prospects", {
-        headers: { Authorization: token }
+        headers: { Authorization: token },
+        params: { page }
       })
       .then((res) => {
         setInactiveProspects(res.data);
@@ -276,11 +277,12 @@ export default function Dashboard() {
       .finally(() => setLoading(false));
   };
 
-  const getDuplicateProspects = () => {
+  const getDuplicateProspects = (page = 1) => {
     setLoading(true);
     axios
       .get("http://localhost:4001/get-duplicate-prospects", {
-        headers: { Authorization: token }
+        headers: { Authorization: token },
+        params: { page }
       })
       .then((res) => {
         setDuplicateProspects(res.data);
@@ -290,11 +292,12 @@ export default function Dashboard() {
       .finally(() => setLoading(false));
   };
 
-  const getMissingFieldsProspects = () => {
+  const getMissingFieldsProspects = (page = 1) => {
     setLoading(true);
     axios
       .get("http://localhost:4001/get-missing-fields-prospects", {
-        headers: { Authorization: token }
+        headers: { Authorization: token },
+        params: { page }
       })
       .then((res) => {
         setMissingFieldsProspects(res.data);
@@ -480,7 +483,7 @@ export default function Dashboard() {
       alert("Please get form stats first");
       return;
     }
-    if (activeTab === "utm" && (!utmAnalysis?.utm_analysis?.export_data?.length && !campaignEngagement?.campaign_engagement_analysis)) {
+    if (activeTab === "utm" && (!utmAnalysis?.utm_analysis?.prospects_with_utm_issues && !campaignEngagement?.campaign_engagement_analysis)) {
       alert("Please run UTM or Campaign analysis first");
       return;
     }
@@ -505,11 +508,11 @@ export default function Dashboard() {
           data: formStats
         };
       } else if (activeTab === "utm") {
-        if (utmAnalysis?.utm_analysis?.export_data?.length) {
+        if (utmAnalysis?.utm_analysis?.prospects_with_utm_issues) {
+          // The backend fills in the rows from its last UTM audit
           exportData = {
             title: `UTM Issues Analysis ${new Date().getFullYear()}`,
-            data_type: "utm",
-            data: utmAnalysis.utm_analysis.export_data
+            data_type: "utm"
           };
         } else if (campaignEngagement?.campaign_engagement_analysis) {
           const campaignData = [];
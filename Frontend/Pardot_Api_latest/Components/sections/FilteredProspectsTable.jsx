@@ -1,11 +1,8 @@
-import React, { useState } from 'react';
-
-export default function FilteredProspectsTable({ prospects, isLoading }) {
-  const [sortField, setSortField] = useState('lastActivityAt');
-  const [sortDirection, setSortDirection] = useState('desc');
-  const [currentPage, setCurrentPage] = useState(1);
-  const [itemsPerPage] = useState(50);
+import React from 'react';
+import PaginationControls from './PaginationControls';
 
+// Sorting and paging happen on the server; this table renders one page
+export default function FilteredProspectsTable({ prospects, pagination, sortField, sortDirection, onSort, onPageChange, isLoading }) {
   if (isLoading) {
     return (
       <div style={{
@@ -39,37 +36,10 @@ export default function FilteredProspectsTable({ prospects, isLoading }) {
   }
 
   const handleSort = (field) => {
-    if (sortField === field) {
-      setSortDirection(sortDirection === 'asc' ? 'desc' : 'asc');
-    } else {
-      setSortField(field);
-      setSortDirection('desc');
-    }
-    setCurrentPage(1);
+    onSort(field, sortField === field && sortDirection === 'desc' ? 'asc' : 'desc');
   };
 
-  const sortedProspects = [...prospects].sort((a, b) => {
-    let aValue = a[sortField];
-    let bValue = b[sortField];
-
-    if (sortField === 'lastActivityAt' || sortField === 'createdAt') {
-      aValue = aValue ? new Date(aValue) : new Date(0);
-      bValue = bValue ? new Date(bValue) : new Date(0);
-    }
-
-    if (sortField === 'score') {
-      aValue = aValue || 0;
-      bValue = bValue || 0;
-    }
-
-    if (aValue < bValue) return sortDirection === 'asc' ? -1 : 1;
-    if (aValue > bValue) return sortDirection === 'asc' ? 1 : -1;
-    return 0;
-  });
-
-  const totalPages = Math.ceil(sortedProspects.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const paginatedProspects = sortedProspects.slice(startIndex, startIndex + itemsPerPage);
+  const total = pagination ? pagination.total : prospects.length;
 
   const formatDate = (dateString) => {
     if (!dateString) return 'Never';
@@ -114,12 +84,12 @@ export default function FilteredProspectsTable({ prospects, isLoading }) {
           margin: 0,
           color: "#f1f5f9"
         }}>
-          Filtered Prospects ({prospects.length})
+          Filtered Prospects ({total})
         </h3>
         
         {/* Pagination Info */}
         <div style={{ color: "#94a3b8", fontSize: "0.9rem" }}>
-          Page {currentPage} of {totalPages} ({prospects.length} total)
+          Page {pagination ? pagination.page : 1} of {pagination ? pagination.total_pages : 1} ({total} total)
         </div>
       </div>
 
@@ -205,7 +175,7 @@ export default function FilteredProspectsTable({ prospects, isLoading }) {
             </tr>
           </thead>
           <tbody>
-            {paginatedProspects.map((prospect, index) => {
+            {prospects.map((prospect, index) => {
               const activityStatus = getActivityStatus(prospect.lastActivityAt);
               return (
                 <tr key={prospect.id || index} style={{
@@ -289,51 +259,7 @@ export default function FilteredProspectsTable({ prospects, isLoading }) {
       </div>
 
       {/* Pagination */}
-      {totalPages > 1 && (
-        <div style={{
-          display: "flex",
-          justifyContent: "center",
-          alignItems: "center",
-          gap: "8px",
-          marginTop: "20px"
-        }}>
-          <button
-            onClick={() => setCurrentPage(Math.max(1, currentPage - 1))}
-            disabled={currentPage === 1}
-            style={{
-              padding: "8px 12px",
-              background: currentPage === 1 ? "rgba(107, 114, 128, 0.2)" : "rgba(59, 130, 246, 0.2)",
-              border: "1px solid rgba(59, 130, 246, 0.3)",
-              color: currentPage === 1 ? "#6b7280" : "#3b82f6",
-              borderRadius: "6px",
-              cursor: currentPage === 1 ? "not-allowed" : "pointer",
-              fontSize: "0.9rem"
-            }}
-          >
-            Previous
-          </button>
-          
-          <span style={{ color: "#94a3b8", fontSize: "0.9rem" }}>
-            {currentPage} / {totalPages}
-          </span>
-          
-          <button
-            onClick={() => setCurrentPage(Math.min(totalPages, currentPage + 1))}
-            disabled={currentPage === totalPages}
-            style={{
-              padding: "8px 12px",
-              background: currentPage === totalPages ? "rgba(107, 114, 128, 0.2)" : "rgba(59, 130, 246, 0.2)",
-              border: "1px solid rgba(59, 130, 246, 0.3)",
-              color: currentPage === totalPages ? "#6b7280" : "#3b82f6",
-              borderRadius: "6px",
-              cursor: currentPage === totalPages ? "not-allowed" : "pointer",
-              fontSize: "0.9rem"
-            }}
-          >
-            Next
-          </button>
-        </div>
-      )}
+      <PaginationControls pagination={pagination} onPageChange={onPageChange} />
     </div>
   );
 }
\ No newline at end of file
@@ -0,0 +1,47 @@
+import React from 'react';
+
+export default function PaginationControls({ pagination, onPageChange }) {
+  if (!pagination || pagination.total_pages <= 1) return null;
+
+  const { page, total_pages: totalPages } = pagination;
+
+  const buttonStyle = (disabled) => ({
+    padding: "8px 12px",
+    background: disabled ? "rgba(107, 114, 128, 0.2)" : "rgba(59, 130, 246, 0.2)",
+    border: "1px solid rgba(59, 130, 246, 0.3)",
+    color: disabled ? "#6b7280" : "#3b82f6",
+    borderRadius: "6px",
+    cursor: disabled ? "not-allowed" : "pointer",
+    fontSize: "0.9rem"
+  });
+
+  return (
+    <div style={{
+      display: "flex",
+      justifyContent: "center",
+      alignItems: "center",
+      gap: "8px",
+      marginTop: "20px"
+    }}>
+      <button
+        onClick={() => onPageChange(page - 1)}
+        disabled={page <= 1}
+        style={buttonStyle(page <= 1)}
+      >
+        Previous
+      </button>
+
+      <span style={{ color: "#94a3b8", fontSize: "0.9rem" }}>
+        {page} / {totalPages}
+      </span>
+
+      <button
+        onClick={() => onPageChange(page + 1)}
+        disabled={page >= totalPages}
+        style={buttonStyle(page >= totalPages)}
+      >
+        Next
+      </button>
+    </div>
+  );
+}
@@ -1,6 +1,10 @@
 import React, { useState, useEffect } from "react";
 import ProspectFilters from "./ProspectFilters";
 import FilteredProspectsTable from "./FilteredProspectsTable";
+import PaginationControls from "./PaginationControls";
+
+// Rows per page of the filtered prospect table
+const FILTER_PAGE_SIZE = 50;
 
 export default function ProspectsSection({ 
   prospectHealth,
@@ -14,14 +18,16 @@ export default function ProspectsSection({
   getMissingFieldsProspects
 }) {
   const [filteredProspects, setFilteredProspects] = useState([]);
+  const [filterPagination, setFilterPagination] = useState(null);
+  const [activeFilters, setActiveFilters] = useState({});
+  const [sort, setSort] = useState({ field: 'lastActivityAt', direction: 'desc' });
   const [isFilterLoading, setIsFilterLoading] = useState(false);
   const [showFilters, setShowFilters] = useState(false);
   
-  // Initialize with all prospects when component mounts
+  // Load the first page of the unfiltered prospect list from the server-side snapshot
   useEffect(() => {
-    if (prospectHealth?.all_prospects) {
-      console.log('Setting initial prospects:', prospectHealth.all_prospects.length);
-      setFilteredProspects(prospectHealth.all_prospects);
+    if (prospectHealth) {
+      handleFiltersChange({});
     }
   }, [prospectHealth]);
 
@@ -39,7 +45,8 @@ export default function ProspectsSection({
     }
   }, [prospectHealth, filteredProspects]);
 
-  const handleFiltersChange = async (filters) => {
+  // Fetch one page of filtered prospects; the server filters, sorts and pages the snapshot
+  const loadFilteredPage = async (filters, page, sortOrder) => {
     setIsFilterLoading(true);
     try {
       const token = localStorage.getItem('access_token');
@@ -51,25 +58,49 @@ export default function ProspectsSection({
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify(filters)
+        body: JSON.stringify({
+          ...filters,
+          page,
+          page_size: FILTER_PAGE_SIZE,
+          sort: sortOrder.field,
+          direction: sortOrder.direction
+        })
       });
       
       if (response.ok) {
         const data = await response.json();
         console.log('Filter response:', data);
         setFilteredProspects(data.prospects || []);
+        setFilterPagination(data.pagination || null);
       } else {
         const errorText = await response.text();
         console.error('Filter failed:', response.status, errorText);
         setFilteredProspects([]);
+        setFilterPagination(null);
       }
     } catch (error) {
       console.error('Error filtering prospects:', error);
       setFilteredProspects([]);
+      setFilterPagination(null);
     } finally {
       setIsFilterLoading(false);
     }
   };
+
+  const handleFiltersChange = (filters) => {
+    setActiveFilters(filters);
+    loadFilteredPage(filters, 1, sort);
+  };
+
+  const handleSortChange = (field, direction) => {
+    const sortOrder = { field, direction };
+    setSort(sortOrder);
+    loadFilteredPage(activeFilters, 1, sortOrder);
+  };
+
+  const handlePageChange = (page) => {
+    loadFilteredPage(activeFilters, page, sort);
+  };
   
   if (!prospectHealth) return null;
 
@@ -130,7 +161,7 @@ export default function ProspectsSection({
           cursor: "pointer",
           transition: "all 0.3s ease"
         }}
-        onClick={getDuplicateProspects}
+        onClick={() => getDuplicateProspects()}
         onMouseOver={(e) => {
           e.currentTarget.style.transform = "translateY(-4px)";
           e.currentTarget.style.boxShadow = "0 12px 40px rgba(239, 68, 68, 0.15)";
@@ -174,7 +205,7 @@ export default function ProspectsSection({
           cursor: "pointer",
           transition: "all 0.3s ease"
         }}
-        onClick={getInactiveProspects}
+        onClick={() => getInactiveProspects()}
         onMouseOver={(e) => {
           e.currentTarget.style.transform = "translateY(-4px)";
           e.currentTarget.style.boxShadow = "0 12px 40px rgba(245, 158, 11, 0.15)";
@@ -218,7 +249,7 @@ export default function ProspectsSection({
           cursor: "pointer",
           transition: "all 0.3s ease"
         }}
-        onClick={getMissingFieldsProspects}
+        onClick={() => getMissingFieldsProspects()}
         onMouseOver={(e) => {
           e.currentTarget.style.transform = "translateY(-4px)";
           e.currentTarget.style.boxShadow = "0 12px 40px rgba(139, 92, 246, 0.15)";
@@ -324,6 +355,7 @@ export default function ProspectsSection({
               </div>
             ))}
           </div>
+          <PaginationControls pagination={inactiveProspects.pagination} onPageChange={getInactiveProspects} />
         </div>
       )}
 
@@ -397,6 +429,7 @@ export default function ProspectsSection({
               </div>
             ))}
           </div>
+          <PaginationControls pagination={duplicateProspects.pagination} onPageChange={getDuplicateProspects} />
         </div>
       )}
 
@@ -477,6 +510,7 @@ export default function ProspectsSection({
               </div>
             ))}
           </div>
+          <PaginationControls pagination={missingFieldsProspects.pagination} onPageChange={getMissingFieldsProspects} />
         </div>
       )}
 
@@ -521,13 +555,18 @@ export default function ProspectsSection({
             <ProspectFilters
               onFiltersChange={handleFiltersChange}
               totalProspects={prospectHealth?.total_prospects || 0}
-              filteredCount={filteredProspects.length}
+              filteredCount={filterPagination ? filterPagination.total : filteredProspects.length}
             />
           )}
 
           {/* Filtered Prospects Table */}
           <FilteredProspectsTable
             prospects={filteredProspects}
+            pagination={filterPagination}
+            sortField={sort.field}
+            sortDirection={sort.direction}
+            onSort={handleSortChange}
+            onPageChange={handlePageChange}
             isLoading={isFilterLoading}
           />
         </div>
@@ -581,6 +581,15 @@ export default function UTMSection({ utmAnalysis, campaignEngagement }) {
               }}>
                 <strong>Active:</strong> Has prospects, emails, or forms created in last {campaignEngagement.campaign_engagement_analysis?.months_analyzed || 6} months • <strong>Inactive:</strong> No activity in timeframe
               </p>
+              {campaignEngagement.campaign_engagement_analysis?.status === "PARTIAL" && (
+                <p style={{
+                  color: "#fcd34d",
+                  margin: "4px 0 0 0",
+                  fontSize: "1rem"
+                }}>
+                  <strong>Partial results:</strong> {Object.keys(campaignEngagement.campaign_engagement_analysis.errors || {}).join(", ")} could not be fetched, so some campaigns may be shown as inactive
+                </p>
+              )}
             </div>
           </div>
 